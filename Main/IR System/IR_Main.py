@@ -1,151 +1,111 @@
+import startup_metrics
 import sys
-import requests
-import subprocess
 import os
 import datetime
+import time
 import numpy as np
-import matplotlib.pyplot as plt
-import runpy
 import io
 import contextlib
+import argparse
+import functools
 from PyQt5.QtWidgets import (QTextEdit, QApplication, QWidget, QVBoxLayout, QLabel, QLineEdit, 
                              QPushButton,QHBoxLayout, QTableWidget, QTableWidgetItem, QComboBox, 
-                             QHeaderView, QStatusBar, QMessageBox, QTabWidget, QScrollArea, QStackedWidget)
-from PyQt5.QtCore import QProcess, QThread, pyqtSignal
-from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT as NavigationToolbar
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.figure import Figure
-from sentence_transformers import SentenceTransformer
-from xml.etree import ElementTree as ET
+                             QHeaderView, QStatusBar, QMessageBox, QTabWidget, QScrollArea, QStackedWidget, QTableView)
+from PyQt5.QtCore import QThread, pyqtSignal, QObject, QRunnable, QThreadPool, QTimer
 from pathlib import Path
-
-
-SOLR_SELECT_URL = 'http://localhost:8990/solr/research-papers/select'
-SOLR_QUERY_URL = 'http://localhost:8990/solr/research-papers/query'
-BERT_MODEL = SentenceTransformer('all-MiniLM-L6-v2')
-
-def load_queries(qry_file="cran.qry.xml"):
-    queries = {}
-    root = ET.parse(qry_file).getroot()
-
-    qrel_path = Path(__file__).resolve().parent / "cranqrel.trec.txt"
-    rel_counts = {}
-    with open(qrel_path, 'r') as f:
-        for line in f:
-            qid, _, _, rel = line.strip().split()
-            if rel == '1':
-                rel_counts[qid] = rel_counts.get(qid, 0) + 1
-
-    for top in root.findall("top"):
-        qid = top.findtext("num").strip()
-        title = top.findtext("title").strip().replace('\n', ' ')
-        count = rel_counts.get(qid, 0)
-        marker = "⭐" if count >= 10 else ""
-        queries[qid] = f"{marker} {title}"
-    return queries
-
-
-def load_qrels(qrel_path):
-    qrels = {}
-    with open(qrel_path, 'r') as f:
-        for line in f:
-            qid, _, docid, rel = line.strip().split()
-            qid = qid.strip() 
-            if rel == '1':
-                qrels.setdefault(qid, set()).add(docid)
-    return qrels
-
-
-QREL_PATH = str(Path(__file__).resolve().parent / "cranqrel.trec.txt")
-QRELS = load_qrels(QREL_PATH)
-
-
-def evaluate_results(retrieved_ids, relevant_ids, k=50):
-    def normalize(ids):
-        return set(str(int(str(doc).strip())) for doc in ids if str(doc).strip().isdigit())
-
-    retrieved_k = list(normalize(retrieved_ids))[:k]
-    retrieved_set = normalize(retrieved_ids)
-    relevant_set = normalize(relevant_ids)
-
-    true_positives = len(set(retrieved_k) & relevant_set)
-    precision = true_positives / k if k else 0
-    recall = len(retrieved_set & relevant_set) / len(relevant_set) if relevant_set else 0
-
-    ap = 0
-    hits = 0
-    for i, doc_id in enumerate(retrieved_ids):
-        doc_id_norm = str(int(str(doc_id).strip())) if str(doc_id).strip().isdigit() else None
-        if doc_id_norm and doc_id_norm in relevant_set:
-            hits += 1
-            ap += hits / (i + 1)
-
-    map_score = ap / len(relevant_set) if relevant_set else 0
-    return precision, recall, map_score
-
+import solr_client
+from query_cache import QUERY_CACHE_TTL, QueryVectorCache
+from query_builders import PARADIGMS, SEMANTIC_MODE, SEMANTIC_LOCAL_MODE, PAGE_SIZE, needs_vector
+from results_model import ResultsTableModel, AbstractLoader
+import search_backends
+import instrumentation
+from evaluation import load_queries, get_qrels, evaluate_results
+import model_loader
+from model_loader import LazyModel, warm_up_in_background
+from encoders import ENCODER_BACKENDS
+from solr_services import ServiceManager
+
+
+SOLR_SELECT_URL = solr_client.SELECT_URL
+SOLR_QUERY_URL = f'{solr_client.SOLR_URL}/{solr_client.COLLECTION_NAME}/query'
+# The model (and torch) load in the background after the window is shown, see __main__
+BERT_MODEL = LazyModel()
+# Precision in the Graphs tab is measured over the first page of results
+EVALUATION_CUTOFF = 50
+QUERY_VECTORS = QueryVectorCache(BERT_MODEL)
+startup_metrics.mark("imports")
 
 
 class SearchThread(QThread):
-    result_ready = pyqtSignal(list, str)
+    result_ready = pyqtSignal(list, int, str)
     error_capture = pyqtSignal(str)
 
     def __init__(self, query, mode):
         super().__init__()
         self.main_query = query
         self.paradigm_mode = mode
+        self.vector = None
 
     def run(self):
         try:
-            if self.paradigm_mode == "BM25 Paradigm":
-                params = {
-                    'q': f'title:{self.main_query} OR abstract:{self.main_query} OR text:{self.main_query} OR author:{self.main_query}',
-                    'fl': 'id,title,score,abstract',
-                    'rows': 50,
-                    'wt': 'json'
-                }
-                self.query_params = params 
-                response = requests.get(SOLR_SELECT_URL, params=params)
-            elif self.paradigm_mode == "Hybrid Paradigm (BM25 + Vector)":
-                vector = BERT_MODEL.encode(self.main_query).tolist()
-                vec_str = ','.join([str(round(x, 6)) for x in vector])
-                params = {
-                    'q': f'title:{self.main_query} OR abstract:{self.main_query} OR text:{self.main_query} OR author:{self.main_query}',
-                    'fl': 'id,title,score,abstract',
-                    'rows': 50,
-                    'wt': 'json',
-                    'rq': '{!rerank reRankQuery=$rvec reRankDocs=100 reRankWeight=100.0}',
-                    'rvec': f'{{!knn f=vector topK=100}}[{vec_str}]'
-                }
-                self.query_params = params 
-                response = requests.get(SOLR_SELECT_URL, params=params)
-            elif self.paradigm_mode == "Semantic Paradigm (Vectors)":
-                vector = BERT_MODEL.encode(self.main_query)
-
-                #print(f"[DEBUG] Vector length: {len(vector)}")
-                if len(vector) != 384:
-                    self.error_capture.emit(f"Invalid vector length: {len(vector)} (expected 384)")
-                    return
-
-                vec_str = ','.join([str(round(x, 6)) for x in vector])
-                params = {
-                    'q': f'{{!knn f=vector topK=50}}[{vec_str}]',
-                    'fl': 'id,title,score,abstract',
-                    'rows': 50,
-                    'wt': 'json'
-                }
-                self.query_params = params 
-                response = requests.get(SOLR_SELECT_URL, params=params)
-            else:
-                #response = requests.get(SOLR_SELECT_URL, params=params)
+            if self.paradigm_mode not in PARADIGMS:
                 self.error_capture.emit("Invalid mode.")
                 return
 
-            response.raise_for_status()
-            docs = response.json()['response']['docs']
-            self.result_ready.emit(docs, self.paradigm_mode)
+            start = time.perf_counter()
+            with instrumentation.span("encode", self.paradigm_mode):
+                vector = QUERY_VECTORS.encode(self.main_query) if needs_vector(self.paradigm_mode) else None
+            self.vector = vector
+
+            #print(f"[DEBUG] Vector length: {len(vector)}")
+            if self.paradigm_mode in (SEMANTIC_MODE, SEMANTIC_LOCAL_MODE) and len(vector) != 384:
+                self.error_capture.emit(f"Invalid vector length: {len(vector)} (expected 384)")
+                return
+
+            # Only the first page is fetched here; the results table loads the rest as it scrolls
+            docs, total = search_backends.search_page(self.paradigm_mode, self.main_query, vector, 0, PAGE_SIZE, model=BERT_MODEL)
+            instrumentation.record("total", time.perf_counter() - start, self.paradigm_mode)
+            self.result_ready.emit(docs, total, self.paradigm_mode)
         except Exception as e:
             self.error_capture.emit(str(e))
 
+def evaluate_paradigm(mode, query_text, relevant_docs):
+    try:
+        with instrumentation.span("encode", mode):
+            vector = QUERY_VECTORS.encode(query_text) if needs_vector(mode) else None
+        # Same request as the first page of the results table, so one of them is served from the result cache
+        docs, _ = search_backends.search_page(mode, query_text, vector, 0, PAGE_SIZE, model=BERT_MODEL)
+        doc_ids = [doc.get('id', '') for doc in docs]
+        with instrumentation.span("evaluate", mode):
+            p, r, m = evaluate_results(doc_ids, relevant_docs, k=EVALUATION_CUTOFF)
+        return {'Precision': p, 'Recall': r, 'MAP': m}
+    except Exception as e:
+        print(f"[DEBUG] Error evaluating {mode}: {e}")
+        return {'Precision': 0, 'Recall': 0, 'MAP': 0}
+
+
+class EvaluationSignals(QObject):
+    metrics_ready = pyqtSignal(int, str, dict)
+
+
+class ParadigmEvaluation(QRunnable):
+    def __init__(self, generation, mode, query_text, relevant_docs):
+        super().__init__()
+        self.generation = generation
+        self.mode = mode
+        self.query_text = query_text
+        self.relevant_docs = relevant_docs
+        self.signals = EvaluationSignals()
+
+    def run(self):
+        metrics = evaluate_paradigm(self.mode, self.query_text, self.relevant_docs)
+        self.signals.metrics_ready.emit(self.generation, self.mode, metrics)
+
+
+LATENCY_COLUMNS = [("Paradigm", "paradigm"), ("Stage", "stage"), ("Count", "count"), ("p50 (ms)", "p50_ms"),
+                   ("p95 (ms)", "p95_ms"), ("p99 (ms)", "p99_ms"), ("Per sec", "per_sec")]
+
+
 class GraphsTab(QWidget):
     def __init__(self):
         super().__init__()
@@ -157,38 +117,98 @@ class GraphsTab(QWidget):
         self.switch_to_scores = QPushButton("Show Score Distribution")
         self.switch_to_metrics = QPushButton("Show Evaluation Metrics")
         self.switch_to_scores.clicked.connect(self.show_scores)
+        self.switch_to_latency = QPushButton("Show Latency")
         self.switch_to_metrics.clicked.connect(self.show_metrics)
+        self.switch_to_latency.clicked.connect(self.show_latency)
 
         layout.addWidget(self.switch_to_scores)
         layout.addWidget(self.switch_to_metrics)
+        layout.addWidget(self.switch_to_latency)
 
         self.page_stack = QStackedWidget()
         layout.addWidget(self.page_stack)
 
         self.score_page = QWidget()
         self.score_layout = QVBoxLayout(self.score_page)
-        self.score_figure = Figure(figsize=(10, 6))
-        self.score_canvas = FigureCanvas(self.score_figure)
-        self.score_layout.addWidget(self.score_canvas)
         self.page_stack.addWidget(self.score_page)
 
         self.metric_page = QWidget()
         self.metric_layout = QVBoxLayout(self.metric_page)
-        self.metric_figure, self.metric_ax = plt.subplots(figsize=(10, 6))
-        self.metric_canvas = FigureCanvas(self.metric_figure)
-        self.metric_layout.addWidget(self.metric_canvas)
         self.page_stack.addWidget(self.metric_page)
 
+        self.latency_page = QWidget()
+        self.latency_layout = QVBoxLayout(self.latency_page)
+        self.latency_table = QTableWidget()
+        self.latency_table.setColumnCount(len(LATENCY_COLUMNS))
+        self.latency_table.setHorizontalHeaderLabels([title for title, _ in LATENCY_COLUMNS])
+        self.latency_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.latency_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.latency_layout.addWidget(self.latency_table)
+        self.export_latency_button = QPushButton("Export Latency (JSON / Prometheus)")
+        self.export_latency_button.clicked.connect(self.export_latency)
+        self.latency_layout.addWidget(self.export_latency_button)
+        self.page_stack.addWidget(self.latency_page)
+
+        # Refreshes the latency table once a second while it is on screen
+        self.latency_timer = QTimer(self)
+        self.latency_timer.setInterval(1000)
+        self.latency_timer.timeout.connect(self.refresh_latency)
+
+        self.score_canvas = None
         self.setLayout(layout)
         self.page_stack.setCurrentIndex(0)
 
+    def init_canvases(self):
+        # matplotlib is only imported once something is plotted or the tab is opened
+        if self.score_canvas is not None:
+            return
+        from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+        from matplotlib.figure import Figure
+
+        self.score_figure = Figure(figsize=(10, 6))
+        self.score_canvas = FigureCanvas(self.score_figure)
+        self.score_layout.addWidget(self.score_canvas)
+
+        self.metric_figure = Figure(figsize=(10, 6))
+        self.metric_ax = self.metric_figure.add_subplot(111)
+        self.metric_canvas = FigureCanvas(self.metric_figure)
+        self.metric_layout.addWidget(self.metric_canvas)
+
+    def showEvent(self, event):
+        self.init_canvases()
+        super().showEvent(event)
+        if self.page_stack.currentIndex() == 2:
+            self.refresh_latency()
+
     def show_scores(self):
         self.page_stack.setCurrentIndex(0)
 
     def show_metrics(self):
         self.page_stack.setCurrentIndex(1)
 
+    def show_latency(self):
+        self.page_stack.setCurrentIndex(2)
+        self.refresh_latency()
+
+    def refresh_latency(self):
+        if not self.isVisible() or self.page_stack.currentIndex() != 2:
+            self.latency_timer.stop()
+            return
+        self.latency_timer.start()
+        rows = instrumentation.RECORDER.snapshot()
+        self.latency_table.setRowCount(len(rows))
+        for row_number, row in enumerate(rows):
+            for column, (_, field) in enumerate(LATENCY_COLUMNS):
+                value = row[field]
+                text = f"{value:.1f}" if isinstance(value, float) else str(value)
+                self.latency_table.setItem(row_number, column, QTableWidgetItem(text))
+
+    def export_latency(self):
+        json_path, prom_path = instrumentation.RECORDER.export()
+        QMessageBox.information(self, "Latency Export", f"Written to {json_path} and {prom_path}")
+
     def plot_score_distribution(self, scores):
+        self.init_canvases()
         self.score_figure.clear()
         ax = self.score_figure.add_subplot(111)
         ax.hist(scores, bins=10, color='skyblue', edgecolor='black')
@@ -198,10 +218,11 @@ class GraphsTab(QWidget):
         self.score_canvas.draw()
 
     def plot_metric_comparison(self, metrics):
+        self.init_canvases()
         self.metric_ax.clear()
 
         paradigms = list(metrics.keys())
-        precision = [metrics[p].get('P@10', 0) for p in paradigms]
+        precision = [metrics[p].get('Precision', 0) for p in paradigms]
         recall = [metrics[p].get('Recall', 0) for p in paradigms]
         map_scores = [metrics[p].get('MAP', 0) for p in paradigms]
 
@@ -213,7 +234,7 @@ class GraphsTab(QWidget):
         bar_width = 0.25
         x = np.arange(len(paradigms))
 
-        bars1 = self.metric_ax.bar(x, precision, width=bar_width, label='Precision@50')
+        bars1 = self.metric_ax.bar(x, precision, width=bar_width, label=f'Precision@{EVALUATION_CUTOFF}')
         bars2 = self.metric_ax.bar(x + bar_width, recall, width=bar_width, label='Recall')
         bars3 = self.metric_ax.bar(x + 2 * bar_width, map_scores, width=bar_width, label='MAP')
 
@@ -264,21 +285,23 @@ class SearchTab(QWidget):
 
 
         self.search_mode = QComboBox()
-        self.search_mode.addItems(["BM25 Paradigm", "Semantic Paradigm (Vectors)", "Hybrid Paradigm (BM25 + Vector)"])
+        self.search_mode.addItems(PARADIGMS)
         layout.addWidget(self.search_mode)
 
         self.search_button = QPushButton('Search')
         self.search_button.clicked.connect(self.run_search)
         layout.addWidget(self.search_button)
 
-        self.results_table = QTableWidget()
-        self.results_table.setColumnCount(3)
-        self.results_table.setHorizontalHeaderLabels(['ID', 'Title', 'Score'])
+        self.results_model = ResultsTableModel(self)
+        self.results_model.error.connect(self.handle_error)
+        self.results_table = QTableView()
+        self.results_table.setModel(self.results_model)
+        self.results_table.setSelectionBehavior(QTableView.SelectRows)
         self.results_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         self.results_table.setColumnWidth(0, 80)
         self.results_table.setColumnWidth(2, 80)
 
-        self.results_table.cellDoubleClicked.connect(self.show_abstract)
+        self.results_table.doubleClicked.connect(self.show_abstract)
 
         # layout.addWidget(self.results_table, stretch=1)
         layout.addWidget(self.results_table)
@@ -289,53 +312,31 @@ class SearchTab(QWidget):
         layout.addLayout(button_panel)
         layout.addLayout(info_panel)
         self.setLayout(layout)
-        self.doc_abstracts = {}
+        self.abstract_pool = QThreadPool(self)
+
+        self.evaluation_pool = QThreadPool(self)
+        self.evaluation_pool.setMaxThreadCount(len(PARADIGMS))
+        self.evaluation_generation = 0
+        self.paradigm_metrics = {}
 
     def evaluate_all_paradigms(self, query_id, query_text):
-        relevant_docs = QRELS.get(str(query_id).strip(), set())
-        metrics = {}
-
-        for mode in ["BM25 Paradigm", "Semantic Paradigm (Vectors)", "Hybrid Paradigm (BM25 + Vector)"]:
-            if mode == "BM25 Paradigm":
-                params = {
-                    'q': f'title:{query_text} OR abstract:{query_text} OR text:{query_text} OR author:{query_text}',
-                    'fl': 'id,title,score,abstract',
-                    'rows': 50,
-                    'wt': 'json'
-                }
-            elif mode == "Semantic Paradigm (Vectors)":
-                vector = BERT_MODEL.encode(query_text).tolist()
-                vec_str = ','.join([str(round(x, 6)) for x in vector])
-                params = {
-                    'q': f'{{!knn f=vector topK=50}}[{vec_str}]',
-                    'fl': 'id,title,score,abstract',
-                    'rows': 50,
-                    'wt': 'json'
-                }
-            elif mode == "Hybrid Paradigm (BM25 + Vector)":
-                vector = BERT_MODEL.encode(query_text).tolist()
-                vec_str = ','.join([str(round(x, 6)) for x in vector])
-                params = {
-                    'q': f'title:{query_text} OR abstract:{query_text} OR text:{query_text} OR author:{query_text}',
-                    'fl': 'id,title,score,abstract',
-                    'rows': 50,
-                    'wt': 'json',
-                    'rq': '{!rerank reRankQuery=$rvec reRankDocs=100 reRankWeight=100.0}',
-                    'rvec': f'{{!knn f=vector topK=100}}[{vec_str}]'
-                }
-
-            try:
-                response = requests.get(SOLR_SELECT_URL, params=params)
-                response.raise_for_status()
-                docs = response.json()['response']['docs']
-                doc_ids = [doc.get('id', '') for doc in docs]
-                p, r, m = evaluate_results(doc_ids, relevant_docs, k=50)
-                metrics[mode] = {'P@10': p, 'Recall': r, 'MAP': m}
-            except Exception as e:
-                metrics[mode] = {'P@10': 0, 'Recall': 0, 'MAP': 0}
-                print(f"[DEBUG] Error evaluating {mode}: {e}")
-
-        self.graphs_tab.plot_metric_comparison(metrics)
+        relevant_docs = get_qrels().get(str(query_id).strip(), set())
+
+        # Each paradigm runs on its own pool thread and is plotted as soon as it finishes;
+        # the generation number drops results from a search the user has already replaced
+        self.evaluation_generation += 1
+        self.paradigm_metrics = {}
+        for mode in PARADIGMS:
+            evaluation = ParadigmEvaluation(self.evaluation_generation, mode, query_text, relevant_docs)
+            evaluation.signals.metrics_ready.connect(self.update_paradigm_metrics)
+            self.evaluation_pool.start(evaluation)
+
+    def update_paradigm_metrics(self, generation, mode, metrics):
+        if generation != self.evaluation_generation:
+            return
+        self.paradigm_metrics[mode] = metrics
+        ordered = {m: self.paradigm_metrics[m] for m in PARADIGMS if m in self.paradigm_metrics}
+        self.graphs_tab.plot_metric_comparison(ordered)
 
     def run_search(self):
         if self.query_input.currentIndex() == -1:
@@ -360,70 +361,127 @@ class SearchTab(QWidget):
 
 
 
-    def display_results(self, docs, mode_label):
-        self.results_table.setRowCount(len(docs))
-        self.results_table.resizeRowsToContents()
-        # self.results_table.resizeColumnsToContents()
-
-        self.doc_abstracts = {}
-
-        for row, doc in enumerate(docs):
-            doc_id = doc.get('id', 'N/A')
-            if isinstance(doc_id, list):
-                doc_id = ' '.join(doc_id)
-
-            title = doc.get('title', 'No Title')
-            if isinstance(title, list):
-                title = ' '.join(title)
+    def display_results(self, docs, total, mode_label):
+        render_start = time.perf_counter()
+        thread = self.search_thread
+        fetch_page = functools.partial(search_backends.search_page, mode_label, thread.main_query, thread.vector,
+                                       model=BERT_MODEL)
+        self.results_model.reset_results(docs, total, fetch_page)
+        self.results_table.scrollToTop()
 
-            relevance_score = doc.get('score', 0)
-            score_str = f"{relevance_score:.3f}" if isinstance(relevance_score, (int, float)) else str(relevance_score)
-
-            id_item = QTableWidgetItem(doc_id)
-            title_item = QTableWidgetItem(title)
-            score_item = QTableWidgetItem(score_str)
-
-            self.results_table.setItem(row, 0, id_item)
-            self.results_table.setItem(row, 1, title_item)
-            self.results_table.setItem(row, 2, score_item)
-
-            abstract = doc.get('abstract', 'No abstract available.')
-            if isinstance(abstract, list):
-                abstract = ' '.join(abstract)
-            self.doc_abstracts[row] = abstract
-
-
-        self.status_bar.showMessage(f"Found {len(docs)} documents ({mode_label}).")
+        cache = search_backends.RESULT_CACHE.stats()
+        vectors = QUERY_VECTORS.stats()
+        self.status_bar.showMessage(f"Found {total} documents ({mode_label}). Result cache: "
+                                    f"{cache['hit_rate']:.0%} hit rate, {cache['saved_ms'] / 1000:.1f}s saved. "
+                                    f"Query vectors: {vectors['hit_rate']:.0%} hit rate, {vectors['size']} cached.")
+        startup_metrics.mark("first query")
         self.search_button.setEnabled(True)
 
         scores = [doc.get('score', 0) for doc in docs]
         self.graphs_tab.plot_score_distribution(scores)
+        instrumentation.record("render", time.perf_counter() - render_start, mode_label)
         
     def handle_error(self, msg):
         self.status_bar.showMessage(f"Error: {msg}")
         self.search_button.setEnabled(True)
 
-    def show_abstract(self, row, column):
-        abstract = self.doc_abstracts.get(row, 'No abstract available.')
+    def show_abstract(self, index):
+        doc = self.results_model.doc_at(index.row())
+        if doc is None:
+            self.status_bar.showMessage("That result is still loading.")
+            return
+        if doc.get('abstract'):
+            self.show_abstract_text(doc['abstract'])
+            return
+        loader = AbstractLoader(doc, search_backends.fetch_abstract)
+        loader.signals.abstract_ready.connect(self.show_abstract_text)
+        self.abstract_pool.start(loader)
+
+    def show_abstract_text(self, abstract):
         if isinstance(abstract, list):
             abstract = ' '.join(abstract)
         QMessageBox.information(self, "Document Abstract", abstract)
 
 
 
-class SolrProcessWidget(QWidget):
-    def __init__(self, bat_file_path="temp.bat"):
+class ServiceLog(QObject):
+    # Service log lines arrive on reader threads; the signal queues them to the console
+    line = pyqtSignal(str)
+
+
+class ServiceThread(QThread):
+    # Starting or stopping the services waits on health checks, so it runs off the GUI thread
+    done = pyqtSignal(str, bool)
 
-        if getattr(sys, 'frozen', False):
-            base_path = sys._MEIPASS
+    def __init__(self, manager, action):
+        super().__init__()
+        self.manager = manager
+        self.action = action
+
+    def run(self):
+        if self.action == "start":
+            self.done.emit(self.action, self.manager.start())
         else:
-            base_path = os.path.dirname(os.path.abspath(__file__))
+            self.manager.stop()
+            self.done.emit(self.action, True)
+
+
+class LineWriter(io.TextIOBase):
+    # A stdout stand-in that passes each complete line to `on_line`
+
+    def __init__(self, on_line):
+        super().__init__()
+        self.on_line = on_line
+        self.pending = ""
+
+    def write(self, text):
+        lines = (self.pending + text).split("\n")
+        self.pending = lines.pop()
+        for line in lines:
+            self.on_line(line)
+        return len(text)
+
+    def flush(self):
+        if self.pending:
+            self.on_line(self.pending)
+            self.pending = ""
+
+
+class CollectionThread(QThread):
+    # Provisioning and indexing wait on Solr and encode the corpus, so they run off the GUI
+    # thread too; printed output is forwarded line by line through the service log signal
+    done = pyqtSignal(bool)
+
+    def __init__(self, on_output):
+        super().__init__()
+        self.on_output = on_output
+
+    def run(self):
+        import collection_updates
+
+        writer = LineWriter(self.on_output)
+        succeeded = False
+        try:
+            with contextlib.redirect_stdout(writer):
+                # An empty argument list: the GUI's own command line is not meant for the script
+                succeeded = collection_updates.main([])
+        except Exception as e:
+            writer.flush()
+            self.on_output(f"Failed to run create_collection.py: {e}")
+        writer.flush()
+        self.done.emit(bool(succeeded))
 
-        self.bat_file_path = os.path.join(base_path, "temp.bat")
+
+class SolrProcessWidget(QWidget):
+    def __init__(self):
         super().__init__()
-        # self.bat_file_path = bat_file_path
-        self.process = QProcess(self)
+        self.service_thread = None
+        self.collection_thread = None
         self.init_ui()
+        self.service_log = ServiceLog(self)
+        self.service_log.line.connect(self.output_console.append)
+        self.services = ServiceManager(on_output=self.service_log.line.emit)
+        QApplication.instance().aboutToQuit.connect(self.shutdown)
 
     def init_ui(self):
         layout = QVBoxLayout()
@@ -455,55 +513,46 @@ class SolrProcessWidget(QWidget):
 
         self.setLayout(layout)
 
-        self.process.readyReadStandardOutput.connect(self.handle_stdout)
-        self.process.readyReadStandardError.connect(self.handle_stderr)
-        self.process.finished.connect(self.process_finished)
-
+    def run_service_action(self, action):
+        if any(thread is not None and thread.isRunning() for thread in (self.service_thread, self.collection_thread)):
+            self.output_console.append("Please wait for the current start/stop to finish.\n")
+            return
+        self.run_button.setEnabled(False)
+        self.disconnect_button.setEnabled(False)
+        self.service_thread = ServiceThread(self.services, action)
+        self.service_thread.done.connect(self.process_finished)
+        self.service_thread.start()
 
     def run_script(self):
         self.output_console.clear()
-
-        self.output_console.append("Killing existing Java processes...\n")
-        try:
-            subprocess.run(["taskkill", "/F", "/IM", "java.exe"], check=True, capture_output=True)
-            self.output_console.append("Terminated java.exe processes.\n")
-        except subprocess.CalledProcessError as e:
-            self.output_console.append(f"Could not kill java.exe processes or none were running.\n")
-
-        if not Path(self.bat_file_path).exists():
-            self.output_console.append(f"Error: Cannot find {self.bat_file_path}")
-            self.status_label.setText("Connection Status: Disconnected")
-            return
-
-        self.output_console.append(f"Running: {self.bat_file_path}\n")
         self.status_label.setText("Connection Status: Starting...")
-        self.process.start("cmd.exe", ["/c", self.bat_file_path])
-
+        self.run_service_action("start")
 
     def stop_solr(self):
         self.output_console.append("\nStopping Solr...\n")
-        stop_script = str(Path(self.bat_file_path).parent / "solr-9.5.0" / "bin" / "solr.cmd")
-        if not Path(stop_script).exists():
-            self.output_console.append("Error: Could not find solr.cmd to stop Solr.\n")
-            self.status_label.setText("Connection Status: Unknown")
-            return
-
         self.status_label.setText("Connection Status: Disconnecting...")
-        self.process.start("cmd.exe", ["/c", stop_script, "stop", "-all"])
-
-    def handle_stdout(self):
-        data = self.process.readAllStandardOutput()
-        self.output_console.append(str(data, encoding='utf-8'))
-
-    def handle_stderr(self):
-        data = self.process.readAllStandardError()
-        self.output_console.append(str(data, encoding='utf-8'))
-
-    def process_finished(self):
+        self.run_service_action("stop")
+
+    def shutdown(self):
+        # Only services this window started are stopped; ones that were already running stay up
+        for thread in (self.service_thread, self.collection_thread):
+            if thread is not None:
+                thread.wait()
+        self.services.stop()
+
+    def process_finished(self, action, succeeded):
+        self.run_button.setEnabled(True)
+        self.disconnect_button.setEnabled(True)
         self.output_console.append("\nProcess finished.")
+        if action == "start" and not succeeded:
+            self.status_label.setText("Connection Status: Disconnected")
+            return
         try:
-            response = requests.get("http://localhost:8990/solr/admin/info/system", timeout=5)
-            if response.status_code == 200:
+            response = solr_client.get(f"{solr_client.SOLR_URL}/admin/info/system", timeout=5, retry=False)
+            if response.status_code == 200 and action == "stop":
+                # Solr was running before this window started it, so it was left up
+                self.status_label.setText("Connection Status: ZooKeeper & Solr Online")
+            elif response.status_code == 200:
                 self.status_label.setText("Connection Status: ZooKeeper & Solr Online")
                 self.output_console.append("Solr is online. Proceeding to create collection...\n")
                 self.run_create_collection()
@@ -513,15 +562,18 @@ class SolrProcessWidget(QWidget):
             self.status_label.setText("Connection Status: Disconnected")
 
     def run_create_collection(self):
-        script_path = Path(__file__).resolve().parent / "collection_updates.py"
-        output_buffer = io.StringIO()
+        self.run_button.setEnabled(False)
+        self.disconnect_button.setEnabled(False)
+        self.output_console.append("Create Collection Output:")
+        self.collection_thread = CollectionThread(self.service_log.line.emit)
+        self.collection_thread.done.connect(self.collection_finished)
+        self.collection_thread.start()
 
-        try:
-            with contextlib.redirect_stdout(output_buffer):
-                runpy.run_path(str(script_path), run_name="__main__")
-            self.output_console.append("Create Collection Output:\n" + output_buffer.getvalue())
-        except Exception as e:
-            self.output_console.append(f"Failed to run create_collection.py: {e}")
+    def collection_finished(self, succeeded):
+        self.run_button.setEnabled(True)
+        self.disconnect_button.setEnabled(True)
+        if not succeeded:
+            self.output_console.append("Collection setup did not complete.")
 
 
 class InfoTab(QWidget):
@@ -570,7 +622,7 @@ class InfoTab(QWidget):
         </ul>
 
         <p>
-        Ensure all directories (e.g., <code>jdk-17</code>, <code>zookeeper</code>, <code>solr-9.5.0</code>) and the <code>temp.bat</code> file are present in the main application folder.
+        Ensure all directories (e.g., <code>jdk-17</code>, <code>zookeeper</code>, <code>solr-9.5.0</code>) are present in the main application folder. On Linux and macOS a Java 17 runtime from <code>JAVA_HOME</code> or the <code>PATH</code> is used instead of the bundled Windows JDK.
         </p>
         """)
 
@@ -596,8 +648,7 @@ class MainWindow(QWidget):
         self.search_tab = SearchTab(self.status_bar, self.graphs_tab)
 
         self.tabs.addTab(InfoTab(), "Information")
-        root_bat_path = str(Path(__file__).resolve().parents[1] / "temp.bat")
-        self.tabs.addTab(SolrProcessWidget(bat_file_path=root_bat_path), "Solr Setup")
+        self.tabs.addTab(SolrProcessWidget(), "Solr Setup")
         self.tabs.addTab(self.search_tab, "Search")
         self.tabs.addTab(self.graphs_tab, "Graphs")
 
@@ -606,8 +657,27 @@ class MainWindow(QWidget):
         main_layout.addWidget(self.status_bar)
         self.setLayout(main_layout)
 
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Semantic IR System")
+    parser.add_argument("--encoder", choices=ENCODER_BACKENDS, default=model_loader.DEFAULT_BACKEND,
+                        help="Inference backend used to encode queries")
+    parser.add_argument("--encoder-threads", type=int, default=None, help="Intra-op threads for the encoder (default all cores)")
+    parser.add_argument("--query-cache-ttl", type=float, default=QUERY_CACHE_TTL,
+                        help="Seconds a cached query vector stays valid (default: until evicted)")
+    # Anything else is left for Qt
+    return parser.parse_known_args()
+
+
 if __name__ == '__main__':
-    app = QApplication(sys.argv)
+    args, qt_args = parse_args()
+    model_loader.configure(backend=args.encoder, threads=args.encoder_threads)
+    QUERY_VECTORS.ttl = args.query_cache_ttl
+    app = QApplication(sys.argv[:1] + qt_args)
     window = MainWindow()
     window.show()
+    startup_metrics.mark("window shown")
+    QTimer.singleShot(0, lambda: startup_metrics.mark("first paint"))
+    warm_up_in_background(lambda: startup_metrics.mark("model ready"))
+    app.aboutToQuit.connect(startup_metrics.save)
     sys.exit(app.exec_())
\ No newline at end of file
@@ -0,0 +1,169 @@
+import json
+import time
+import argparse
+from pathlib import Path
+import numpy as np
+from vector_search import LocalVectorIndex, normalize_rows, top_k_indices
+
+
+DEFAULT_INDEX_PATH = Path(__file__).resolve().parent / "cache" / "ivf_index.npz"
+KMEANS_ITERATIONS = 20
+DEFAULT_NPROBE = 8
+
+
+def spherical_kmeans(vectors, n_lists, iterations=KMEANS_ITERATIONS, seed=0):
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), size=n_lists, replace=False)].copy()
+    assignments = np.zeros(len(vectors), dtype=np.int64)
+    for _ in range(iterations):
+        assignments = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, vectors)
+        counts = np.bincount(assignments, minlength=n_lists)
+        # An empty list is restarted from a random vector so no centroid is wasted
+        empty = np.flatnonzero(counts == 0)
+        sums[empty] = vectors[rng.choice(len(vectors), size=len(empty), replace=False)]
+        new_centroids = normalize_rows(sums)
+        if np.allclose(new_centroids, centroids, atol=1e-6):
+            break
+        centroids = new_centroids
+    return centroids, np.argmax(vectors @ centroids.T, axis=1)
+
+
+class IVFIndex(LocalVectorIndex):
+    # Inverted-file index: vectors are grouped by their nearest k-means centroid and stored
+    # contiguously per list, so a query only scores the nprobe lists closest to it.
+
+    def __init__(self, doc_ids, vectors, centroids, list_offsets, documents=None, nprobe=DEFAULT_NPROBE):
+        super().__init__(doc_ids, vectors, documents)
+        self.centroids = normalize_rows(centroids)
+        self.list_offsets = np.asarray(list_offsets, dtype=np.int64)
+        self.nprobe = nprobe
+
+    @classmethod
+    def build(cls, doc_ids, vectors, n_lists=None, documents=None, nprobe=DEFAULT_NPROBE,
+              iterations=KMEANS_ITERATIONS, seed=0):
+        vectors = normalize_rows(vectors)
+        n_lists = min(n_lists or max(1, int(round(np.sqrt(len(vectors))))), len(vectors))
+        centroids, assignments = spherical_kmeans(vectors, n_lists, iterations, seed)
+        order = np.argsort(assignments, kind='stable')
+        list_offsets = np.concatenate(([0], np.cumsum(np.bincount(assignments, minlength=n_lists))))
+        return cls([doc_ids[i] for i in order], vectors[order], centroids, list_offsets, documents, nprobe)
+
+    @classmethod
+    def from_index(cls, index, n_lists=None, nprobe=DEFAULT_NPROBE, **kwargs):
+        return cls.build(index.doc_ids, index.matrix, n_lists, index.documents, nprobe, **kwargs)
+
+    @property
+    def n_lists(self):
+        return len(self.centroids)
+
+    def search_batch(self, query_vectors, top_k=50, nprobe=None):
+        queries = normalize_rows(np.atleast_2d(query_vectors))
+        nprobe = min(nprobe or self.nprobe, self.n_lists)
+        probes = top_k_indices(queries @ self.centroids.T, nprobe)
+
+        results = []
+        for query, lists in zip(queries, probes):
+            rows = np.concatenate([np.arange(self.list_offsets[l], self.list_offsets[l + 1]) for l in lists])
+            scores = self.matrix[rows] @ query
+            best = top_k_indices(scores, top_k)
+            results.append([self.to_result(int(rows[i]), float(scores[i])) for i in best])
+        return results
+
+    def exact_search_batch(self, query_vectors, top_k=50):
+        return LocalVectorIndex.search_batch(self, query_vectors, top_k)
+
+    def save(self, path=DEFAULT_INDEX_PATH, model_name="", fingerprint=""):
+        # The model name and corpus fingerprint let load() refuse an index built from other vectors
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        np.savez(path, matrix=self.matrix, centroids=self.centroids, list_offsets=self.list_offsets,
+                 doc_ids=np.array(self.doc_ids), documents=np.array(json.dumps(self.documents)),
+                 nprobe=np.array(self.nprobe), model_name=np.array(model_name), fingerprint=np.array(fingerprint))
+
+    @classmethod
+    def load(cls, path=DEFAULT_INDEX_PATH, model_name=None, fingerprint=None):
+        # Returns None when the saved index was built with another model or from another version
+        # of the corpus (or predates the check), so the caller rebuilds it
+        with np.load(path) as data:
+            for key, expected in (("model_name", model_name), ("fingerprint", fingerprint)):
+                saved = str(data[key]) if key in data.files else None
+                if expected is not None and saved != expected:
+                    print(f"[INFO] Saved index {path} is stale ({key} differs), rebuilding.")
+                    return None
+            return cls(data["doc_ids"].tolist(), data["matrix"], data["centroids"], data["list_offsets"],
+                       json.loads(str(data["documents"])), int(data["nprobe"]))
+
+
+def recall_at_k(approximate, exact):
+    found = sum(len({doc["id"] for doc in a} & {doc["id"] for doc in e}) for a, e in zip(approximate, exact))
+    expected = sum(len(e) for e in exact)
+    return found / expected if expected else 0.0
+
+
+def benchmark(index, queries, top_k=10, nprobe_values=(1, 2, 4, 8, 16)):
+    start = time.perf_counter()
+    exact = index.exact_search_batch(queries, top_k)
+    exact_qps = len(queries) / (time.perf_counter() - start)
+    print(f"[INFO] Exact search: {exact_qps:.1f} queries/sec over {len(index)} vectors.")
+
+    report = []
+    for nprobe in nprobe_values:
+        start = time.perf_counter()
+        approximate = index.search_batch(queries, top_k, nprobe=nprobe)
+        qps = len(queries) / (time.perf_counter() - start)
+        recall = recall_at_k(approximate, exact)
+        report.append({"nprobe": nprobe, "recall": recall, "queries_per_sec": qps})
+        print(f"[INFO] nprobe={nprobe:<4} recall@{top_k}={recall:.4f} {qps:.1f} queries/sec")
+    return {"vectors": len(index), "lists": index.n_lists, "top_k": top_k, "exact_queries_per_sec": exact_qps,
+            "results": report}
+
+
+def synthetic_index(count, dimension=384, n_lists=None, seed=0):
+    # Clustered random vectors, for checking scaling without encoding a real corpus
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((max(1, count // 500), dimension)).astype(np.float32)
+    vectors = centres[rng.integers(len(centres), size=count)] + 0.5 * rng.standard_normal((count, dimension)).astype(np.float32)
+    return IVFIndex.build([str(i) for i in range(count)], vectors, n_lists), vectors[rng.integers(count, size=200)]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Build and benchmark an IVF approximate vector index.")
+    parser.add_argument("--n-lists", type=int, default=None, help="Number of k-means lists (default sqrt of corpus size)")
+    parser.add_argument("--nprobe", nargs="+", type=int, default=[1, 2, 4, 8, 16], help="nprobe values to benchmark")
+    parser.add_argument("--top-k", type=int, default=10, help="Cut-off for recall against exact search")
+    parser.add_argument("--index", default=str(DEFAULT_INDEX_PATH), help="Where the index is saved and loaded")
+    parser.add_argument("--rebuild", action="store_true", help="Rebuild the index even if a saved one exists")
+    parser.add_argument("--synthetic", type=int, default=0, help="Benchmark on N synthetic vectors instead of the corpus")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.synthetic:
+        start = time.perf_counter()
+        ivf_index, query_vectors = synthetic_index(args.synthetic, n_lists=args.n_lists)
+        print(f"[INFO] Built {ivf_index.n_lists} lists over {len(ivf_index)} vectors in {time.perf_counter() - start:.2f}s.")
+    else:
+        from model_loader import MODEL_NAME, get_model
+        from evaluation import load_queries
+        from corpus import iter_documents
+        from index_manifest import corpus_fingerprint
+
+        bert_model = get_model()
+        model_name = getattr(bert_model, "name", MODEL_NAME)
+        fingerprint = corpus_fingerprint(iter_documents(), model_name)
+        ivf_index = None
+        if Path(args.index).exists() and not args.rebuild:
+            ivf_index = IVFIndex.load(args.index, model_name, fingerprint)
+            if ivf_index is not None:
+                print(f"[INFO] Loaded index with {ivf_index.n_lists} lists from {args.index}.")
+        if ivf_index is None:
+            start = time.perf_counter()
+            ivf_index = IVFIndex.from_index(LocalVectorIndex.from_corpus(bert_model), n_lists=args.n_lists)
+            ivf_index.save(args.index, model_name, fingerprint)
+            print(f"[INFO] Built {ivf_index.n_lists} lists in {time.perf_counter() - start:.2f}s and saved to {args.index}.")
+        query_texts = [text.replace("⭐", "").strip() for text in load_queries(str(Path(__file__).resolve().parent / "cran.qry.xml")).values()]
+        query_vectors = bert_model.encode(query_texts, batch_size=64)
+    benchmark(ivf_index, query_vectors, top_k=args.top_k, nprobe_values=args.nprobe)
@@ -0,0 +1,221 @@
+import csv
+import json
+import time
+import argparse
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+import search_backends
+import fusion
+import instrumentation
+from query_builders import PARADIGMS, needs_vector
+from evaluation import load_queries, get_qrels
+import model_loader
+from encoders import ENCODER_BACKENDS
+from metrics import compute_metrics
+from query_cache import QueryVectorCache
+
+
+QUERY_FILE = Path(__file__).resolve().parent / "cran.qry.xml"
+DEFAULT_OUTPUT = Path(__file__).resolve().parent / "results" / "batch_evaluation"
+K_VALUES = (10, 50)
+CONCURRENCY = 8
+SCORE_FIELDS = ["precision", "recall", "map", "ndcg", "mrr", "r_precision"]
+RESULT_FIELDS = ["query_id", "paradigm", "k"] + SCORE_FIELDS + ["latency_ms", "error"]
+
+# Kept across run_batch calls, so a sweep such as fusion.py's encodes the queries only once
+_query_vectors = None
+
+
+def query_vectors(model):
+    global _query_vectors
+    if _query_vectors is None or _query_vectors.model is not model:
+        _query_vectors = QueryVectorCache(model)
+    return _query_vectors
+
+
+def load_query_texts(qry_file=QUERY_FILE, limit=None):
+    queries = [(qid, text.replace("⭐", "").strip()) for qid, text in load_queries(str(qry_file)).items()]
+    return queries[:limit] if limit else queries
+
+
+def search_query(query_id, mode, query_text, vector, rows, model):
+    start = time.perf_counter()
+    try:
+        # The result cache is bypassed so every latency is a real search
+        docs, error = search_backends.search(mode, query_text, vector, rows, model, use_cache=False), ""
+    except Exception as e:
+        docs, error = [], str(e)
+    return {
+        "query_id": query_id,
+        "paradigm": mode,
+        "doc_ids": [doc.get('id', '') for doc in docs],
+        "latency_ms": (time.perf_counter() - start) * 1000,
+        "error": error,
+    }
+
+
+def search_query_batch(queries, mode, vectors, rows, model):
+    # In-process backends answer every query with one matrix product instead of one call each
+    start = time.perf_counter()
+    try:
+        results = search_backends.search_many(mode, [text for _, text in queries],
+                                              [vectors.get(qid) for qid, _ in queries], rows, model, use_cache=False)
+        error = ""
+    except Exception as e:
+        results, error = [[] for _ in queries], str(e)
+    latency_ms = (time.perf_counter() - start) * 1000 / max(len(queries), 1)
+    return [{
+        "query_id": qid,
+        "paradigm": mode,
+        "doc_ids": [doc.get('id', '') for doc in docs],
+        "latency_ms": latency_ms,
+        "error": error,
+    } for (qid, _), docs in zip(queries, results)]
+
+
+def score_runs(runs, k_values):
+    # All queries of one paradigm are scored together in a single vectorized pass
+    rows = []
+    qrels = get_qrels()
+    by_paradigm = {}
+    for run in runs:
+        by_paradigm.setdefault(run["paradigm"], []).append(run)
+
+    for mode, mode_runs in by_paradigm.items():
+        results = compute_metrics([run["doc_ids"] for run in mode_runs],
+                                  [qrels.get(str(run["query_id"]).strip(), set()) for run in mode_runs],
+                                  k_values=k_values)
+        for index, run in enumerate(mode_runs):
+            for k in k_values:
+                rows.append({
+                    "query_id": run["query_id"],
+                    "paradigm": mode,
+                    "k": k,
+                    "precision": float(results[f"P@{k}"][index]),
+                    "recall": float(results[f"R@{k}"][index]),
+                    "map": float(results["AP"][index]),
+                    "ndcg": float(results[f"nDCG@{k}"][index]),
+                    "mrr": float(results["MRR"][index]),
+                    "r_precision": float(results["R-Prec"][index]),
+                    "latency_ms": run["latency_ms"],
+                    "error": run["error"],
+                })
+    return rows
+
+
+def aggregate(rows):
+    groups = {}
+    for row in rows:
+        if not row["error"]:
+            groups.setdefault((row["paradigm"], row["k"]), []).append(row)
+
+    summary = []
+    for (mode, k), group in groups.items():
+        latencies = sorted(row["latency_ms"] for row in group)
+        entry = {"paradigm": mode, "k": k, "queries": len(group)}
+        for field in SCORE_FIELDS:
+            entry[field] = sum(row[field] for row in group) / len(group)
+        entry["median_latency_ms"] = latencies[len(latencies) // 2]
+        summary.append(entry)
+    return summary
+
+
+def run_batch(model, paradigms=PARADIGMS, k_values=K_VALUES, concurrency=CONCURRENCY, limit=None):
+    queries = load_query_texts(limit=limit)
+    print(f"[INFO] Evaluating {len(queries)} queries across {len(paradigms)} paradigms...")
+
+    # Every query vector is produced in one batched encode before any request is sent
+    vectors = {}
+    if any(needs_vector(mode) for mode in paradigms):
+        start = time.perf_counter()
+        cache = query_vectors(model)
+        misses = cache.misses
+        encoded = cache.encode_many([text for _, text in queries], batch_size=64)
+        vectors = {qid: vector for (qid, _), vector in zip(queries, encoded)}
+        stats = cache.stats()
+        print(f"[INFO] Encoded {stats['misses'] - misses} of {len(queries)} queries in {time.perf_counter() - start:.2f}s "
+              f"(query vector cache: {stats['hits']} hits, {stats['hit_rate']:.0%} hit rate).")
+
+    rows = max(k_values)
+    start = time.perf_counter()
+    runs = []
+    for mode in paradigms:
+        if mode in search_backends.BATCH_MODES:
+            runs.extend(search_query_batch(queries, mode, vectors, rows, model))
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [
+            executor.submit(search_query, qid, mode, text, vectors.get(qid) if needs_vector(mode) else None, rows, model)
+            for qid, text in queries
+            for mode in paradigms
+            if mode not in search_backends.BATCH_MODES
+        ]
+        runs.extend(future.result() for future in futures)
+    elapsed = time.perf_counter() - start
+
+    results = score_runs(runs, k_values)
+    failures = sum(1 for run in runs if run["error"])
+    print(f"[INFO] Ran {len(runs)} searches in {elapsed:.2f}s ({len(runs) / elapsed:.1f} queries/sec).")
+    if failures:
+        print(f"[ERROR] {failures} searches failed and are left out of the aggregate metrics.")
+    return results, aggregate(results)
+
+
+def write_results(rows, summary, output_prefix):
+    output_prefix = Path(output_prefix)
+    output_prefix.parent.mkdir(parents=True, exist_ok=True)
+
+    with open(output_prefix.with_suffix(".csv"), 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+    summary_path = output_prefix.parent / f"{output_prefix.name}_aggregate.csv"
+    with open(summary_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=list(summary[0].keys()) if summary else ["paradigm", "k"])
+        writer.writeheader()
+        writer.writerows(summary)
+
+    with open(output_prefix.with_suffix(".json"), 'w', encoding='utf-8') as f:
+        json.dump({"aggregate": summary, "per_query": rows}, f, indent=2)
+    print(f"[INFO] Results written to {output_prefix}.csv, {summary_path.name} and {output_prefix.name}.json")
+
+
+def print_summary(summary):
+    for row in sorted(summary, key=lambda r: (r["k"], r["paradigm"])):
+        print(f"[INFO] {row['paradigm']:<35} k={row['k']:<4} P={row['precision']:.4f} R={row['recall']:.4f} "
+              f"MAP={row['map']:.4f} nDCG={row['ndcg']:.4f} MRR={row['mrr']:.4f} R-Prec={row['r_precision']:.4f} "
+              f"({row['queries']} queries)")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Evaluate every Cranfield query against each retrieval paradigm.")
+    parser.add_argument("--paradigms", nargs="+", default=PARADIGMS, choices=PARADIGMS, help="Paradigms to evaluate")
+    parser.add_argument("--k", nargs="+", type=int, default=list(K_VALUES), help="Cut-offs to report metrics at")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY, help="Searches in flight at once")
+    parser.add_argument("--limit", type=int, default=None, help="Only evaluate the first N queries")
+    parser.add_argument("--fusion-method", choices=fusion.FUSION_METHODS, default=fusion.current_settings()["method"],
+                        help="How the rank fusion hybrid combines its result lists")
+    parser.add_argument("--fusion-depth", type=int, default=fusion.current_settings()["depth"],
+                        help="Results fetched from each source before fusion")
+    parser.add_argument("--fusion-weights", type=float, nargs=2, default=list(fusion.current_settings()["weights"]),
+                        metavar=("BM25", "VECTOR"), help="Weight of each fused result list")
+    parser.add_argument("--encoder", choices=ENCODER_BACKENDS, default=model_loader.DEFAULT_BACKEND,
+                        help="Inference backend used to encode the queries")
+    parser.add_argument("--encoder-threads", type=int, default=None, help="Intra-op threads for the encoder (default all cores)")
+    parser.add_argument("--output", default=str(DEFAULT_OUTPUT), help="Output path prefix for the CSV/JSON files")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    model_loader.configure(backend=args.encoder, threads=args.encoder_threads)
+    fusion.configure(method=args.fusion_method, depth=args.fusion_depth, weights=tuple(args.fusion_weights))
+    # BM25-only runs never encode anything, so the model is not loaded for them
+    bert_model = model_loader.get_model() if any(needs_vector(mode) for mode in args.paradigms) else None
+    rows, summary = run_batch(bert_model, paradigms=args.paradigms, k_values=sorted(set(args.k)),
+                              concurrency=args.concurrency, limit=args.limit)
+    print_summary(summary)
+    write_results(rows, summary, args.output)
+    # Per-stage breakdown (request vs JSON parsing vs in-process search) of the same run
+    json_path, prom_path = instrumentation.RECORDER.export(f"{args.output}_latency")
+    print(f"[INFO] Stage latencies written to {json_path.name} and {prom_path.name}")
@@ -0,0 +1,237 @@
+import sys
+import json
+import time
+import argparse
+import datetime
+import platform
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import solr_client
+import batch_evaluate
+import model_loader
+from encoders import ENCODER_BACKENDS, timed_encode
+from corpus import CORPUS_PATH, iter_documents
+from query_builders import BM25_MODE, SEMANTIC_MODE, HYBRID_MODE, BM25_LOCAL_MODE, SEMANTIC_LOCAL_MODE, FUSION_MODE, needs_vector
+from mock_solr import DEFAULT_RECORDINGS_PATH, MockSolrServer, RecordedResponses, record_local, save_recordings
+
+
+SECTIONS = ("ingest", "encoder", "latency", "quality")
+DEFAULT_PARADIGMS = [BM25_MODE, SEMANTIC_MODE, HYBRID_MODE, BM25_LOCAL_MODE, SEMANTIC_LOCAL_MODE, FUSION_MODE]
+DEFAULT_CLIENTS = (1, 4, 8)
+DEFAULT_OUTPUT = Path(__file__).resolve().parent / "results" / "benchmark.json"
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "results" / "benchmark_baseline.json"
+BENCHMARK_COLLECTION = "benchmark"
+ENCODER_SAMPLE = 500
+# Relative slowdown allowed before a timing counts as a regression, and absolute MAP/P@k loss
+PERF_TOLERANCE = 0.15
+QUALITY_TOLERANCE = 0.005
+# Metric name suffixes where a larger value is better; everything else is a latency
+HIGHER_IS_BETTER = ("docs_per_sec", "queries_per_sec", "qps", "map", "precision", "recall", "ndcg")
+
+
+def percentiles(latencies_ms):
+    values = np.asarray(latencies_ms, dtype=np.float64)
+    if not len(values):
+        return {"p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "mean_ms": 0.0}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"p50_ms": float(p50), "p95_ms": float(p95), "p99_ms": float(p99), "mean_ms": float(values.mean())}
+
+
+def benchmark_ingestion(server, xml_path=CORPUS_PATH, batch_size=64, chunk_size=500):
+    # The real upload path (stream, encode, post, commit) against the stand-in server, under its
+    # own collection name so the manifest and generation token of the real collection are untouched
+    import collection_updates
+
+    original_url, original_collection = collection_updates.SOLR_URL, collection_updates.COLLECTION_NAME
+    collection_updates.SOLR_URL = server.url
+    collection_updates.COLLECTION_NAME = BENCHMARK_COLLECTION
+    try:
+        received = server.documents_received
+        start = time.perf_counter()
+        collection_updates.upload_documents(xml_path, batch_size=batch_size, chunk_size=chunk_size, use_cache=False)
+        elapsed = time.perf_counter() - start
+    finally:
+        collection_updates.SOLR_URL, collection_updates.COLLECTION_NAME = original_url, original_collection
+    documents = server.documents_received - received
+    return {"documents": documents, "seconds": elapsed, "docs_per_sec": documents / elapsed if elapsed > 0 else 0.0}
+
+
+def benchmark_encoder(model, query_texts, sample=ENCODER_SAMPLE):
+    texts = [doc["text"] for _, doc in zip(range(sample), iter_documents())]
+    _, docs_per_sec = timed_encode(model, texts, batch_size=64)
+    latencies = []
+    for text in query_texts:
+        start = time.perf_counter()
+        model.encode(text)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return {"backend": getattr(model, "backend", "torch"), "docs_per_sec": docs_per_sec, "query": percentiles(latencies)}
+
+
+def benchmark_latency(model, queries, vectors, paradigms, clients, rows):
+    report, runs = {}, []
+    for mode in paradigms:
+        report[mode] = {}
+        for count in clients:
+            with ThreadPoolExecutor(max_workers=count) as executor:
+                start = time.perf_counter()
+                futures = [executor.submit(batch_evaluate.search_query, qid, mode, text,
+                                           vectors.get(qid) if needs_vector(mode) else None, rows, model)
+                           for qid, text in queries]
+                mode_runs = [future.result() for future in futures]
+                elapsed = time.perf_counter() - start
+            failures = [run for run in mode_runs if run["error"]]
+            report[mode][f"clients={count}"] = {
+                "queries": len(mode_runs), "errors": len(failures), "qps": len(mode_runs) / elapsed,
+                **percentiles([run["latency_ms"] for run in mode_runs if not run["error"]]),
+            }
+            print(f"[INFO] {mode:<35} clients={count:<3} {len(mode_runs) / elapsed:>8.1f} qps  "
+                  f"p50={report[mode][f'clients={count}']['p50_ms']:.1f}ms  p99={report[mode][f'clients={count}']['p99_ms']:.1f}ms")
+            if failures:
+                print(f"[ERROR] {len(failures)} {mode} searches failed, e.g. {failures[0]['error']}")
+            if count == clients[0]:
+                runs.extend(mode_runs)
+    return report, runs
+
+
+def quality_report(runs, k_values):
+    summary = batch_evaluate.aggregate(batch_evaluate.score_runs(runs, k_values))
+    report = {}
+    for row in summary:
+        report.setdefault(row["paradigm"], {})[f"k={row['k']}"] = {
+            field: row[field] for field in ("precision", "recall", "map", "ndcg")
+        }
+    return report
+
+
+def flatten(report, prefix=""):
+    values = {}
+    for key, value in report.items():
+        name = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            values.update(flatten(value, name))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            values[name] = float(value)
+    return values
+
+
+def compare(results, baseline, perf_tolerance=PERF_TOLERANCE, quality_tolerance=QUALITY_TOLERANCE):
+    # Only metrics present in both runs are compared; counts and sizes are skipped
+    current, previous = flatten(results["sections"]), flatten(baseline["sections"])
+    regressions = []
+    for name in sorted(set(current) & set(previous)):
+        metric = name.rsplit(".", 1)[-1]
+        higher_is_better = metric.endswith(HIGHER_IS_BETTER)
+        if not (higher_is_better or metric.endswith("_ms")):
+            continue
+        new, old = current[name], previous[name]
+        change = (new - old) / old if old else 0.0
+        if metric in ("map", "precision", "recall", "ndcg"):
+            regressed = old - new > quality_tolerance
+        elif higher_is_better:
+            regressed = change < -perf_tolerance
+        else:
+            regressed = change > perf_tolerance
+        if regressed or abs(change) > perf_tolerance:
+            print(f"[{'ERROR' if regressed else 'INFO'}] {name}: {old:.4f} -> {new:.4f} ({change:+.1%})")
+        if regressed:
+            regressions.append({"metric": name, "baseline": old, "current": new, "change": change})
+    return regressions
+
+
+def load_recordings(path, model, queries, vectors):
+    if not Path(path).exists():
+        # No recordings from a real Solr yet; the in-process engines stand in for it
+        from vector_search import get_vector_index
+        from bm25_index import get_bm25_index
+
+        print(f"[INFO] {path} not found, recording stand-in responses from the in-process engines.")
+        save_recordings(record_local(queries, [vectors[qid] for qid, _ in queries],
+                                     get_vector_index(model), get_bm25_index()), path)
+    return RecordedResponses.load(path)
+
+
+def run_benchmark(args):
+    model = model_loader.get_model()
+    queries = batch_evaluate.load_query_texts(limit=args.limit)
+    start = time.perf_counter()
+    encoded = model.encode([text for _, text in queries], batch_size=64)
+    vectors = {qid: vector for (qid, _), vector in zip(queries, encoded)}
+    print(f"[INFO] Encoded {len(queries)} queries in {time.perf_counter() - start:.2f}s.")
+
+    results = {
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "machine": {"platform": platform.platform(), "python": platform.python_version(), "processor": platform.processor()},
+        "settings": {"encoder": args.encoder, "encoder_threads": args.encoder_threads, "clients": args.clients,
+                     "queries": len(queries), "latency_ms": args.latency_ms, "mock": not args.live},
+        "sections": {},
+    }
+    server = None
+    if not args.live:
+        recordings = load_recordings(args.recordings, model, queries, vectors)
+        server = MockSolrServer(recordings, solr_client.COLLECTION_NAME, latency_ms=args.latency_ms).start()
+        solr_client.SELECT_URL = server.select_url
+        print(f"[INFO] Stand-in Solr listening at {server.url}")
+    try:
+        if "ingest" in args.sections:
+            if server is None:
+                print("[INFO] Skipping ingestion against a live Solr; it would rewrite the collection.")
+            else:
+                results["sections"]["ingest"] = benchmark_ingestion(server)
+        if "encoder" in args.sections:
+            results["sections"]["encoder"] = benchmark_encoder(model, [text for _, text in queries])
+        if "latency" in args.sections or "quality" in args.sections:
+            latency, runs = benchmark_latency(model, queries, vectors, args.paradigms, sorted(set(args.clients)), max(args.k))
+            if "latency" in args.sections:
+                results["sections"]["latency"] = latency
+            if "quality" in args.sections:
+                results["sections"]["quality"] = quality_report(runs, sorted(set(args.k)))
+    finally:
+        if server is not None:
+            server.stop()
+    return results
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark ingestion, encoding, search latency and retrieval quality.")
+    parser.add_argument("--sections", nargs="+", choices=SECTIONS, default=list(SECTIONS), help="Benchmarks to run")
+    parser.add_argument("--paradigms", nargs="+", default=DEFAULT_PARADIGMS, help="Paradigms to time")
+    parser.add_argument("--clients", nargs="+", type=int, default=list(DEFAULT_CLIENTS), help="Concurrent client counts")
+    parser.add_argument("--k", nargs="+", type=int, default=[10, 50], help="Cut-offs for the quality metrics")
+    parser.add_argument("--limit", type=int, default=None, help="Only use the first N queries")
+    parser.add_argument("--encoder", choices=ENCODER_BACKENDS, default=model_loader.DEFAULT_BACKEND, help="Encoder backend")
+    parser.add_argument("--encoder-threads", type=int, default=None, help="Intra-op threads for the encoder")
+    parser.add_argument("--live", action="store_true", help="Use the running Solr instead of the stand-in server")
+    parser.add_argument("--recordings", default=str(DEFAULT_RECORDINGS_PATH), help="Recorded Solr responses (see mock_solr.py)")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Delay the stand-in server adds to every search")
+    parser.add_argument("--output", default=str(DEFAULT_OUTPUT), help="Where the JSON results are written")
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE), help="Baseline results to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=PERF_TOLERANCE, help="Allowed relative slowdown before failing")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    model_loader.configure(backend=args.encoder, threads=args.encoder_threads)
+    benchmark_results = run_benchmark(args)
+
+    baseline_path = Path(args.baseline)
+    regressions = []
+    if baseline_path.exists() and not args.save_baseline:
+        with open(baseline_path, 'r', encoding='utf-8') as f:
+            regressions = compare(benchmark_results, json.load(f), perf_tolerance=args.tolerance)
+        benchmark_results["baseline"] = {"path": str(baseline_path), "regressions": regressions}
+
+    Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(benchmark_results, f, indent=2)
+    print(f"[INFO] Results written to {args.output}")
+    if args.save_baseline:
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(baseline_path, 'w', encoding='utf-8') as f:
+            json.dump(benchmark_results, f, indent=2)
+        print(f"[INFO] Saved as baseline at {baseline_path}")
+    if regressions:
+        print(f"[ERROR] {len(regressions)} metrics regressed against {baseline_path}")
+        sys.exit(1)
@@ -0,0 +1,160 @@
+import re
+import math
+import threading
+from collections import Counter
+import numpy as np
+from corpus import CORPUS_PATH, iter_documents
+from vector_search import top_k_indices
+
+
+FIELDS = ("title", "author", "text")
+BM25_K1 = 1.2
+BM25_B = 0.75
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+# Upper bounds are widened slightly so float32 rounding in the accumulated scores can never
+# make a pruned document beat the threshold it was pruned against
+BOUND_SLACK = 1e-5
+
+
+def kth_largest(values, k):
+    if len(values) < k:
+        return 0.0
+    return float(np.partition(values, len(values) - k)[len(values) - k])
+
+
+def tokenize(text):
+    # Close to Solr's text_general analysis: split on non-alphanumerics and lowercase, no stopwords
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class FieldIndex:
+    # Postings are two parallel arrays per term (document numbers, ascending, and term
+    # frequencies); idf, per-document length norms and each term's largest impact are
+    # computed up front.
+
+    def __init__(self, token_lists, k1=BM25_K1, b=BM25_B):
+        count = len(token_lists)
+        lengths = np.array([len(tokens) for tokens in token_lists], dtype=np.float32)
+        average_length = float(lengths.mean()) if count and lengths.mean() > 0 else 1.0
+        self.norms = (k1 * (1 - b + b * lengths / average_length)).astype(np.float32)
+
+        postings = {}
+        for doc, tokens in enumerate(token_lists):
+            for term, frequency in Counter(tokens).items():
+                docs, frequencies = postings.setdefault(term, ([], []))
+                docs.append(doc)
+                frequencies.append(frequency)
+
+        self.postings = {}
+        self.idf = {}
+        self.max_impacts = {}
+        for term, (docs, frequencies) in postings.items():
+            docs = np.array(docs, dtype=np.int32)
+            frequencies = np.array(frequencies, dtype=np.float32)
+            self.postings[term] = (docs, frequencies)
+            # Lucene's BM25 idf, which never goes negative for very common terms
+            self.idf[term] = math.log(1 + (count - len(docs) + 0.5) / (len(docs) + 0.5))
+            self.max_impacts[term] = float(self.impacts(term, docs, frequencies).max())
+
+    def impacts(self, term, docs, frequencies):
+        return self.idf[term] * frequencies / (frequencies + self.norms[docs])
+
+
+class BM25Index:
+    def __init__(self, documents, fields=FIELDS, k1=BM25_K1, b=BM25_B):
+        self.doc_ids = [doc["id"] for doc in documents]
+        self.documents = {doc["id"]: {"title": doc["title"], "abstract": doc["abstract"]} for doc in documents}
+        self.fields = {field: FieldIndex([tokenize(doc.get(field, "")) for doc in documents], k1, b) for field in fields}
+
+    @classmethod
+    def from_corpus(cls, xml_path=CORPUS_PATH, **kwargs):
+        return cls(list(iter_documents(xml_path)), **kwargs)
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+    def to_result(self, index, score):
+        doc_id = self.doc_ids[index]
+        fields = self.documents.get(doc_id, {})
+        return {"id": doc_id, "title": fields.get("title", ""), "abstract": fields.get("abstract", ""), "score": float(score)}
+
+    def clauses(self, query_text):
+        # One clause per (field, term), like Solr's OR across fields; repeated query terms add up
+        clauses = []
+        for term, weight in Counter(tokenize(query_text)).items():
+            for field in self.fields.values():
+                if term in field.postings:
+                    clauses.append((field, term, weight))
+        return clauses
+
+    def search(self, query_text, top_k=50):
+        # MaxScore: clauses are read in order of their score upper bound. Once the bounds of the
+        # clauses left cannot lift an unseen document past the current k-th best score, those
+        # lists are non-essential: they are only probed for the candidates already found, and
+        # candidates that cannot reach the threshold even with every remaining clause are dropped.
+        clauses = self.clauses(query_text)
+        if not clauses or top_k <= 0:
+            return []
+        bounds = np.array([weight * field.max_impacts[term] for field, term, weight in clauses]) * (1 + BOUND_SLACK)
+        order = np.argsort(-bounds, kind='stable')
+        clauses = [clauses[i] for i in order]
+        # remaining[i] is the most that clauses i onwards can add to any document's score
+        remaining = np.append(np.cumsum(bounds[order][::-1])[::-1], 0.0)
+
+        scores = np.zeros(len(self.doc_ids), dtype=np.float32)
+        threshold = 0.0
+        essential = len(clauses)
+        for i, (field, term, weight) in enumerate(clauses):
+            docs, frequencies = field.postings[term]
+            scores[docs] += weight * field.impacts(term, docs, frequencies)
+            # Equivalent to the k-th best score exceeding the bound, without a partition per clause
+            if np.count_nonzero(scores > remaining[i + 1]) >= top_k:
+                threshold = kth_largest(scores, top_k)
+                essential = i + 1
+                break
+
+        # Every impact is positive, so the documents seen so far are exactly the non-zero scores
+        candidates = np.flatnonzero(scores)
+        for i in range(essential, len(clauses)):
+            candidates = candidates[scores[candidates] + remaining[i] >= threshold]
+            field, term, weight = clauses[i]
+            docs, frequencies = field.postings[term]
+            positions = np.minimum(np.searchsorted(docs, candidates), len(docs) - 1)
+            found = docs[positions] == candidates
+            matched = candidates[found]
+            scores[matched] += weight * field.impacts(term, matched, frequencies[positions[found]])
+            threshold = max(threshold, kth_largest(scores[candidates], top_k))
+
+        best = candidates[top_k_indices(scores[candidates], top_k)]
+        return [self.to_result(int(i), scores[i]) for i in best]
+
+    def search_exhaustive(self, query_text, top_k=50):
+        # Every posting of every clause into one dense accumulator; the reference search() must match
+        clauses = self.clauses(query_text)
+        if not clauses or top_k <= 0:
+            return []
+        scores = np.zeros(len(self.doc_ids), dtype=np.float32)
+        for field, term, weight in clauses:
+            docs, frequencies = field.postings[term]
+            scores[docs] += weight * field.impacts(term, docs, frequencies)
+        matched = np.flatnonzero(scores)
+        best = matched[top_k_indices(scores[matched], top_k)]
+        return [self.to_result(int(i), scores[i]) for i in best]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_bm25_index():
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = BM25Index.from_corpus()
+        return _index
+
+
+def reset_bm25_index():
+    global _index
+    with _index_lock:
+        _index = None
@@ -1,20 +1,38 @@
 import sys
 import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from pathlib import Path
-import requests
 import xml.etree.ElementTree as ET
-from sentence_transformers import SentenceTransformer
+import solr_client
+import model_loader
+from model_loader import LazyModel
+from encoders import ENCODER_BACKENDS
+from embedding_cache import EmbeddingCache
+from index_manifest import IndexManifest
+from result_cache import bump_generation
+from readiness import PROVISION_TIMEOUT, deadline_after, wait_until
+from schema_spec import SCHEMA_SPEC, schema_commands
+from shard_routing import COMPOSITE_ID_ROUTER, ROUTERS, ShardRouter
+from corpus import EMBED_BATCH_SIZE, encode_documents, iter_documents, iter_chunks
 
 
-SOLR_URL = "http://localhost:8990/solr"
-COLLECTION_NAME = "research-papers"
+SOLR_URL = solr_client.SOLR_URL
+COLLECTION_NAME = solr_client.COLLECTION_NAME
+EMBED_WORKERS = 0
+UPLOAD_CHUNK_SIZE = 500
+UPLOAD_THREADS = 4
+NUM_SHARDS = 1
+REPLICATION_FACTOR = 1
+CONFIG_NAME = '_default'
 
-bert_model = SentenceTransformer('all-MiniLM-L6-v2')
+# Shares the process-wide model, so running this from the GUI does not load a second copy
+bert_model = LazyModel()
 
 def check_collection_exists():
     print("[INFO] Checking if collection exists...")
     try:
-        check_exist_request = requests.get(f"{SOLR_URL}/admin/collections?action=LIST")
+        check_exist_request = solr_client.get(f"{SOLR_URL}/admin/collections?action=LIST")
         check_exist_request.raise_for_status()
         collections = check_exist_request.json().get("collections", [])
         if COLLECTION_NAME in collections:
@@ -26,164 +44,297 @@ def check_collection_exists():
         return False
 
 
-def wait_for_collection_ready(name, retries=10, delay=3):
+def collection_ready(name):
+    # Every replica of every shard must be active on a live node, not just listed
+    status_request = solr_client.get(f"{SOLR_URL}/admin/collections", params={'action': 'CLUSTERSTATUS', 'collection': name},
+                                     retry=False)
+    status_request.raise_for_status()
+    cluster = status_request.json().get("cluster", {})
+    collection = cluster.get("collections", {}).get(name)
+    if not collection:
+        return False
+    live_nodes = set(cluster.get("live_nodes", []))
+    replicas = [replica for shard in collection.get("shards", {}).values() for replica in shard.get("replicas", {}).values()]
+    return bool(replicas) and all(replica.get("state") == "active" and replica.get("node_name") in live_nodes
+                                  for replica in replicas)
+
+
+def wait_for_collection_ready(name, deadline=None):
     print(f"[INFO] Waiting for collection '{name}' to become ready...")
-    for _ in range(retries):
-        try:
-            check_ready_request = requests.get(f"{SOLR_URL}/admin/collections?action=LIST")
-            check_ready_request.raise_for_status()
-            if name in check_ready_request.json().get("collections", []):
-                print(f"[INFO] Collection '{name}' is ready.")
-                return True
-        except Exception:
-            pass
-        time.sleep(delay)
-    print(f"[ERROR] Collection '{name}' did not become ready in time.")
-    return False
+    return bool(wait_until(lambda: collection_ready(name), deadline or deadline_after(), f"Collection '{name}' is ready"))
+
+
+def read_schema():
+    schema_request = solr_client.get(f"{SOLR_URL}/{COLLECTION_NAME}/schema", retry=False)
+    schema_request.raise_for_status()
+    return schema_request.json().get("schema")
 
 
-def wait_for_schema_ready(timeout=30):
+def wait_for_schema_ready(deadline=None):
+    # The first successful read is the whole schema, which update_schema compares against
     print("[INFO] Waiting for schema API to become available...")
-    url = f"{SOLR_URL}/{COLLECTION_NAME}/schema/fields"
-    for i in range(timeout):
-        try:
-            schema_request = requests.get(url)
-            if schema_request.status_code == 200:
-                print("[INFO] Schema API is available.")
-                return True
-        except requests.exceptions.RequestException:
-            pass
-        time.sleep(1)
-    print("[ERROR] Schema API did not become available.")
-    return False
+    return wait_until(read_schema, deadline or deadline_after(), "Schema API is available")
+
+
+def solr_online():
+    solr_response = solr_client.get(f"{SOLR_URL}/admin/info/system", timeout=5, retry=False)
+    return solr_response.status_code == 200
 
 
-def wait_for_solr(max_attempts=10, delay=2):
+def wait_for_solr(deadline=None):
     print("[INFO] Waiting for Solr to become available...")
-    for attempt in range(max_attempts):
-        try:
-            solr_response = requests.get(f"{SOLR_URL}/admin/info/system", timeout=5)
-            if solr_response.status_code == 200:
-                print("[INFO] Solr is online.")
-                return True
-        except:
-            print(f"[INFO] Attempt {attempt + 1} failed. Retrying in {delay}s...")
-        time.sleep(delay)
-    print("[ERROR] Solr did not become available.")
-    return False
+    return bool(wait_until(solr_online, deadline or deadline_after(), "Solr is online"))
 
 
-def create_collection():
-    print(f"[INFO] Creating collection '{COLLECTION_NAME}'...")
+def create_collection(num_shards=NUM_SHARDS, replication_factor=REPLICATION_FACTOR,
+                      router_name=COMPOSITE_ID_ROUTER, router_field=None):
+    print(f"[INFO] Creating collection '{COLLECTION_NAME}' ({num_shards} shards x {replication_factor} replicas, "
+          f"{router_name} router)...")
     params = {
         'action': 'CREATE',
         'name': COLLECTION_NAME,
-        'numShards': 1,
-        'replicationFactor': 1,
-        'collection.configName': '_default'
+        'numShards': num_shards,
+        'replicationFactor': replication_factor,
+        'router.name': router_name,
+        'collection.configName': CONFIG_NAME,
+        # Solr answers once every replica is active instead of as soon as the cores are placed
+        'waitForFinalState': 'true'
     }
+    if router_name == 'implicit':
+        # The implicit router has no hash ranges; its shards are named up front
+        del params['numShards']
+        params['shards'] = ",".join(f"shard{i + 1}" for i in range(num_shards))
+    if router_field:
+        params['router.field'] = router_field
     try:
-        create_collection_request = requests.get(f"{SOLR_URL}/admin/collections", params=params)
+        # CREATE is not idempotent, so it is sent once with room for Solr to finish placing the cores
+        create_collection_request = solr_client.get(f"{SOLR_URL}/admin/collections", params=params,
+                                                    timeout=(solr_client.CONNECT_TIMEOUT, 120), retry=False)
         create_collection_request.raise_for_status()
         print("[INFO] Collection creation completed.")
     except Exception as e:
         print(f"[INFO] Failed to create collection: {e}")
 
 
-def schema_field_exists(field_name):
-    url = f"{SOLR_URL}/{COLLECTION_NAME}/schema/fields/{field_name}"
-    check_schema_request = requests.get(url)
-    return check_schema_request.status_code == 200
+def delete_collection(name):
+    print(f"[INFO] Deleting collection '{name}'...")
+    delete_collection_request = solr_client.get(f"{SOLR_URL}/admin/collections", params={'action': 'DELETE', 'name': name},
+                                                timeout=(solr_client.CONNECT_TIMEOUT, 120), retry=False)
+    delete_collection_request.raise_for_status()
 
-def schema_type_exists(type_name):
-    url = f"{SOLR_URL}/{COLLECTION_NAME}/schema/fieldtypes/{type_name}"
-    check_schema_FT_request = requests.get(url)
-    return check_schema_FT_request.status_code == 200
 
-def update_schema():
+def update_schema(schema=None, spec=SCHEMA_SPEC):
+    # One read of the live schema and at most one multi-command write, instead of a request per field
     print("[INFO] Updating schema fields...")
+    commands = schema_commands(schema if schema is not None else read_schema(), spec)
+    if not commands:
+        print("[INFO] Schema already matches the spec.")
+        return
+    update_request = solr_client.post(f"{SOLR_URL}/{COLLECTION_NAME}/schema", json=commands,
+                                      headers={"Content-Type": "application/json"})
+    update_request.raise_for_status()
+    errors = update_request.json().get("errors")
+    if errors:
+        raise RuntimeError(f"Schema update rejected: {errors}")
+    changes = ", ".join(f"{len(items)} {command}" for command, items in commands.items())
+    print(f"[INFO] Schema update completed ({changes}).")
+
 
-    if not schema_type_exists("knn_vector"):
-        field_type_payload = {
-            "add-field-type": {
-                "name": "knn_vector",
-                "class": "solr.DenseVectorField",
-                "vectorDimension": 384,
-                "similarityFunction": "cosine"
-            }
-        }
-        update_request = requests.post(f"{SOLR_URL}/{COLLECTION_NAME}/schema", json=field_type_payload)
-        update_request.raise_for_status()
-
-    fields_to_add = [
-        {"name": "title", "type": "text_general", "stored": True},
-        {"name": "author", "type": "text_general", "stored": True},
-        {"name": "text", "type": "text_general", "stored": True},
-        {"name": "abstract", "type": "text_general", "stored": True},
-        {"name": "vector", "type": "knn_vector", "indexed": True, "stored": False}
-    ]
-
-    for field in fields_to_add:
-        if not schema_field_exists(field["name"]):
-            create_field_request = requests.post(f"{SOLR_URL}/{COLLECTION_NAME}/schema",
-                              json={"add-field": field},
-                              headers={"Content-Type": "application/json"})
-            create_field_request.raise_for_status()
-
-    print("[INFO] Schema update completed.")
-
-
-def upload_documents(xml_path):
-    print("[INFO] Uploading documents...")
+def verify_embeddings(texts, embeddings, sample_size=20, tolerance=1e-5):
+    # Re-encodes a sample one document at a time (the original ingestion path) and compares
+    sample = range(0, len(texts), max(1, len(texts) // sample_size))
+    max_diff = 0.0
+    for i in sample:
+        reference = bert_model.encode(texts[i])
+        diff = max(abs(a - b) for a, b in zip(reference.tolist(), embeddings[i]))
+        max_diff = max(max_diff, diff)
+    if max_diff > tolerance:
+        print(f"[ERROR] Batched embeddings differ from per-document embeddings (max diff {max_diff:.2e}).")
+        return False
+    print(f"[INFO] Batched embeddings match per-document embeddings (max diff {max_diff:.2e}).")
+    return True
+
+
+def post_documents(docs, update_url=None):
+    update_url = update_url or f"{SOLR_URL}/{COLLECTION_NAME}/update"
     try:
-        with open(xml_path, 'r', encoding='utf-8', errors='ignore') as f:
-            raw_data = f.read()
-
-        wrapped_data = f"<root>\n{raw_data}\n</root>"
-        root = ET.fromstring(wrapped_data)
-
-        docs = []
-        for doc in root.findall("doc"):
-            text = doc.findtext("text", "").strip()
-            abstract = " ".join(text.split()[:50])
-            embedding = bert_model.encode(text).tolist()
-            docs.append({
-                # "id": doc.findtext("docno", "").strip(),
-                "id": str(int(doc.findtext("docno", "0").strip())),
-                "title": doc.findtext("title", "").strip(),
-                "author": doc.findtext("author", "").strip(),
-                "text": doc.findtext("text", "").strip(),
-                "abstract": " ".join(doc.findtext("text", "").strip().split()[:50]),
-                "vector": embedding  # Added vectors field for semantic search
-            })
-
-        update_url = f"{SOLR_URL}/{COLLECTION_NAME}/update?commit=true"
-        document_upload_request = requests.post(update_url, json=docs, headers={"Content-Type": "application/json"})
+        document_upload_request = solr_client.post(update_url, json=docs, headers={"Content-Type": "application/json"})
         document_upload_request.raise_for_status()
-        print(f"[INFO] Uploaded {len(docs)} documents.")
+        return len(docs), []
+    except Exception as e:
+        if len(docs) == 1:
+            print(f"[ERROR] Document {docs[0].get('id')} was rejected: {e}")
+            return 0, [docs[0].get('id')]
+
+    # Resend the chunk one document at a time so a single bad document only loses itself
+    uploaded, failed = 0, []
+    for doc in docs:
+        doc_uploaded, doc_failed = post_documents([doc], update_url)
+        uploaded += doc_uploaded
+        failed.extend(doc_failed)
+    return uploaded, failed
+
+
+def delete_documents(doc_ids):
+    delete_request = solr_client.post(f"{SOLR_URL}/{COLLECTION_NAME}/update", json={"delete": list(doc_ids)},
+                                   headers={"Content-Type": "application/json"})
+    delete_request.raise_for_status()
+
+
+def commit_documents():
+    commit_request = solr_client.post(f"{SOLR_URL}/{COLLECTION_NAME}/update", json={"commit": {}},
+                                   headers={"Content-Type": "application/json"})
+    commit_request.raise_for_status()
+    # Tells any running search result cache that the collection has changed
+    bump_generation(COLLECTION_NAME)
+
+
+def upload_documents(xml_path, batch_size=EMBED_BATCH_SIZE, workers=EMBED_WORKERS,
+                     chunk_size=UPLOAD_CHUNK_SIZE, verify=False, use_cache=True, incremental=False,
+                     upload_threads=UPLOAD_THREADS):
+    print("[INFO] Uploading documents (incremental)..." if incremental else "[INFO] Uploading documents...")
+    pool = None
+    # Chunks are posted on background threads while the next one is encoded; with a sharded
+    # collection each chunk is split by owning shard and the parts are sent to the leaders in parallel
+    upload_threads = max(1, upload_threads)
+    uploader = ThreadPoolExecutor(max_workers=upload_threads, thread_name_prefix="solr-upload")
+    in_flight = set()
+    try:
+        cache = EmbeddingCache(bert_model.name, bert_model.get_sentence_embedding_dimension()) if use_cache else None
+        # A full upload re-sends every document, an incremental one only what differs from the manifest.
+        # Both read the previous manifest so documents dropped from the file are deleted either way.
+        # Fingerprints include the encoder name, so switching backend re-sends every vector.
+        manifest = IndexManifest(COLLECTION_NAME, bert_model.name)
+        documents = manifest.track(iter_documents(xml_path), skip_unchanged=incremental)
+        if workers and workers > 1 and not bert_model.supports_multi_process:
+            print(f"[INFO] The {bert_model.backend} backend encodes in-process; use --encoder-threads instead of --workers.")
+        elif workers and workers > 1:
+            pool = bert_model.start_multi_process_pool(target_devices=["cpu"] * workers)
+
+        router = ShardRouter.from_cluster(COLLECTION_NAME, SOLR_URL)
+        if router is not None:
+            print(f"[INFO] Routing updates across {router.describe()}.")
+
+        uploaded, failed = 0, []
+        sent, encoded, encode_time = 0, 0, 0.0
+
+        def collect(futures):
+            nonlocal uploaded
+            for future in futures:
+                chunk_uploaded, chunk_failed = future.result()
+                uploaded += chunk_uploaded
+                failed.extend(chunk_failed)
+
+        for chunk_number, docs in enumerate(iter_chunks(documents, chunk_size)):
+            sent += len(docs)
+            texts = [doc["text"] for doc in docs]
+            misses = cache.misses if cache is not None else 0
+            start = time.perf_counter()
+            embeddings = encode_documents(bert_model, texts, batch_size=batch_size, pool=pool, cache=cache)
+            encode_time += time.perf_counter() - start
+            # Cached vectors take no encoding time, so only the documents actually encoded count
+            encoded += cache.misses - misses if cache is not None else len(texts)
+            if verify and chunk_number == 0 and not verify_embeddings(texts, embeddings):
+                return
+            for doc, embedding in zip(docs, embeddings):
+                doc["vector"] = embedding  # Added vectors field for semantic search
+
+            groups = router.route(docs) if router is not None else {None: docs}
+            for update_url, group in groups.items():
+                # Bounded so encoded chunks cannot pile up faster than Solr accepts them
+                while len(in_flight) >= 2 * upload_threads:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    collect(done)
+                in_flight.add(uploader.submit(post_documents, group, update_url))
+            print(f"[INFO] Queued chunk {chunk_number + 1} ({uploaded} documents confirmed so far).")
+
+        collect(wait(in_flight).done)
+
+        removed = manifest.removed_ids()
+        if removed:
+            print(f"[INFO] Deleting {len(removed)} documents no longer in the collection file.")
+            delete_documents(removed)
+
+        # Additions and deletions become visible together in the single commit. With nothing sent or
+        # deleted the collection is unchanged, so caches and local indexes are left valid.
+        if sent or removed:
+            commit_documents()
+        else:
+            print("[INFO] Collection is already up to date, nothing to commit.")
+        manifest.save(failed_ids=failed)
+        rate = encoded / encode_time if encode_time > 0 else 0.0
+        print(f"[INFO] Encoded {encoded} documents at {rate:.1f} docs/sec (batch size {batch_size}, workers {workers or 1}).")
+        if cache is not None:
+            print(f"[INFO] Embedding cache: {cache.hits} hits, {cache.misses} documents encoded.")
+        print(f"[INFO] Uploaded {uploaded} documents.")
+        if failed:
+            print(f"[ERROR] {len(failed)} documents failed to upload: {', '.join(map(str, failed))}")
     except ET.ParseError as e:
         print(f"[ERROR] XML parsing failed: {e}")
     except Exception as e:
         print(f"[INFO] Failed to upload documents: {e}")
+    finally:
+        uploader.shutdown(wait=True, cancel_futures=True)
+        if pool is not None:
+            bert_model.stop_multi_process_pool(pool)
 
 
-if __name__ == "__main__":
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Create the Solr collection and index the Cranfield documents.")
+    parser.add_argument("--batch-size", type=int, default=EMBED_BATCH_SIZE, help="Documents encoded per forward pass")
+    parser.add_argument("--workers", type=int, default=EMBED_WORKERS, help="CPU worker processes for encoding (0 = in-process)")
+    parser.add_argument("--chunk-size", type=int, default=UPLOAD_CHUNK_SIZE, help="Documents sent to Solr per update request")
+    parser.add_argument("--full", action="store_true", help="Re-send every document instead of only changed ones")
+    parser.add_argument("--no-embedding-cache", action="store_true", help="Encode every document even if its vector is cached")
+    parser.add_argument("--encoder", choices=ENCODER_BACKENDS, default=None,
+                        help="Inference backend used to encode documents (default torch)")
+    parser.add_argument("--encoder-threads", type=int, default=None, help="Intra-op threads for the encoder (default all cores)")
+    parser.add_argument("--upload-threads", type=int, default=UPLOAD_THREADS, help="Update requests sent to Solr in parallel")
+    parser.add_argument("--shards", type=int, default=NUM_SHARDS, help="Shards when the collection is created")
+    parser.add_argument("--replicas", type=int, default=REPLICATION_FACTOR, help="Replicas per shard when the collection is created")
+    parser.add_argument("--router", choices=ROUTERS, default=COMPOSITE_ID_ROUTER, help="Document router for a new collection")
+    parser.add_argument("--router-field", default=None, help="Field the router uses instead of the document id")
+    parser.add_argument("--timeout", type=float, default=PROVISION_TIMEOUT, help="Seconds allowed for Solr, the collection and the schema to become ready")
+    parser.add_argument("--verify-embeddings", action="store_true", help="Check batched vectors against per-document encoding")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    # The GUI calls main([]) so its own command line (Qt options included) is never parsed here
+    args = parse_args(argv)
+    # Left alone unless asked for, so a run from the GUI reuses the model it already loaded
+    encoder_settings = {"backend": args.encoder, "threads": args.encoder_threads}
+    model_loader.configure(**{key: value for key, value in encoder_settings.items() if value is not None})
+    # One deadline covers the whole bootstrap, from Solr coming up to the schema being applied
+    provision_start = time.perf_counter()
+    deadline = deadline_after(args.timeout)
+    if not wait_for_solr(deadline):
+        return False
+
     check_exists = check_collection_exists()
     if not check_exists:
-        create_collection()
-
-    if not wait_for_solr():
-        sys.exit(1)
+        create_collection(args.shards, args.replicas, args.router, args.router_field)
 
-    if wait_for_collection_ready(COLLECTION_NAME):
+    if wait_for_collection_ready(COLLECTION_NAME, deadline):
         XML_FILE = Path(__file__).resolve().parent / "cran.all.1400.xml"
-        if wait_for_schema_ready():
-            update_schema()
+        current_schema = wait_for_schema_ready(deadline)
+        if current_schema:
+            update_schema(current_schema)
+            print(f"[INFO] Collection provisioned in {time.perf_counter() - provision_start:.2f}s.")
         else:
             print("[ERROR] Aborting schema update due to unavailable schema API.")
-        upload_documents(XML_FILE)
-    else:
-        print("[ERROR] Collection did not become ready in time.")
+        upload_documents(XML_FILE, batch_size=args.batch_size, workers=args.workers,
+                         chunk_size=args.chunk_size, verify=args.verify_embeddings,
+                         use_cache=not args.no_embedding_cache, incremental=check_exists and not args.full,
+                         upload_threads=args.upload_threads)
+        return True
+    print("[ERROR] Collection did not become ready in time.")
+    return False
+
+
+if __name__ == "__main__":
+    if not main():
+        sys.exit(1)
 
     # xml_path = Path(__file__).resolve().parent / "cran.all.1400.xml"
     # upload_documents(str(xml_path))
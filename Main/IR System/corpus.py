@@ -0,0 +1,83 @@
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+
+CORPUS_PATH = Path(__file__).resolve().parent / "cran.all.1400.xml"
+EMBED_BATCH_SIZE = 64
+
+
+def read_xml_chunks(xml_path=CORPUS_PATH, chunk_size=1 << 16):
+    # The collection file is a sequence of <doc> elements without a root, so one is added around the stream
+    yield "<root>"
+    with open(xml_path, 'r', encoding='utf-8', errors='ignore') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    yield "</root>"
+
+
+def iter_documents(xml_path=CORPUS_PATH):
+    parser = ET.XMLPullParser(events=("start", "end"))
+    root = None
+    for chunk in read_xml_chunks(xml_path):
+        parser.feed(chunk)
+        for event, elem in parser.read_events():
+            if event == "start":
+                if root is None:
+                    root = elem
+                continue
+            if elem.tag != "doc":
+                continue
+
+            text = elem.findtext("text", "").strip()
+            doc = {
+                # "id": doc.findtext("docno", "").strip(),
+                "id": str(int(elem.findtext("docno", "0").strip())),
+                "title": elem.findtext("title", "").strip(),
+                "author": elem.findtext("author", "").strip(),
+                "text": text,
+                "abstract": " ".join(text.split()[:50]),
+            }
+            # Drop the parsed element so memory stays flat however large the file is
+            elem.clear()
+            root.remove(elem)
+            yield doc
+    parser.close()
+
+
+def iter_chunks(items, size):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def encode_documents(model, texts, batch_size=EMBED_BATCH_SIZE, pool=None, cache=None):
+    if not texts:
+        return []
+
+    embeddings = cache.get_many(texts) if cache is not None else [None] * len(texts)
+    missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+    if not missing:
+        return embeddings
+
+    # Sorting by length keeps similar-sized texts in the same batch, so less padding is computed
+    order = sorted(missing, key=lambda i: len(texts[i]))
+    sorted_texts = [texts[i] for i in order]
+
+    if pool is not None:
+        vectors = model.encode_multi_process(sorted_texts, pool, batch_size=batch_size)
+    else:
+        vectors = model.encode(sorted_texts, batch_size=batch_size)
+
+    for position, index in enumerate(order):
+        embeddings[index] = vectors[position].tolist()
+    if cache is not None:
+        cache.put_many(sorted_texts, vectors)
+    return embeddings
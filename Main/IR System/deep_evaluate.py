@@ -0,0 +1,91 @@
+import csv
+import time
+import argparse
+from pathlib import Path
+import search_backends
+import model_loader
+from query_builders import BM25_MODE, SEMANTIC_MODE, HYBRID_MODE, PARADIGMS, needs_vector
+from evaluation import get_qrels
+from metrics import streaming_metrics
+from batch_evaluate import load_query_texts
+
+
+DEFAULT_DEPTH = 1000
+K_VALUES = (10, 100, 1000)
+DEFAULT_OUTPUT = Path(__file__).resolve().parent / "results" / "deep_evaluation"
+
+
+def evaluate_deep(model, paradigms, depth=DEFAULT_DEPTH, k_values=K_VALUES, page_size=200, run_file=None, limit=None):
+    # Rankings are consumed as they stream in: metrics are updated per document and, with a
+    # run file, every result is written straight out, so memory does not grow with depth
+    queries = load_query_texts(limit=limit)
+    qrels = get_qrels()
+    vectors = {}
+    if any(needs_vector(mode) for mode in paradigms):
+        encoded = model.encode([text for _, text in queries], batch_size=64)
+        vectors = {qid: vector for (qid, _), vector in zip(queries, encoded)}
+
+    writer = csv.writer(run_file, delimiter=" ") if run_file is not None else None
+    rows = []
+    for mode in paradigms:
+        tag = mode.replace(" ", "_")
+        start = time.perf_counter()
+        for qid, text in queries:
+
+            def ranked_ids():
+                for rank, doc in enumerate(search_backends.iter_results(mode, text, vectors.get(qid), depth, page_size, model), start=1):
+                    if writer is not None:
+                        # TREC run format: query, Q0, document, rank, score, run tag
+                        writer.writerow([qid, "Q0", doc.get('id', ''), rank, f"{float(doc.get('score', 0.0)):.6f}", tag])
+                    yield doc.get('id', '')
+
+            rows.append({"paradigm": mode, "query_id": qid, **streaming_metrics(ranked_ids(), qrels.get(qid, set()), k_values)})
+        elapsed = time.perf_counter() - start
+        print(f"[INFO] {mode}: {len(queries)} queries to depth {depth} in {elapsed:.1f}s")
+    return rows
+
+
+def summarize(rows, k_values=K_VALUES):
+    summary = []
+    for mode in dict.fromkeys(row["paradigm"] for row in rows):
+        group = [row for row in rows if row["paradigm"] == mode]
+        names = [f"R@{k}" for k in k_values] + [f"P@{k}" for k in k_values] + ["AP", "MRR", "depth"]
+        summary.append({"paradigm": mode, **{name: sum(row[name] for row in group) / len(group) for name in names}})
+        print(f"[INFO] {mode:<35} " + "  ".join(f"R@{k}={summary[-1][f'R@{k}']:.4f}" for k in k_values)
+              + f"  MAP={summary[-1]['AP']:.4f}")
+    return summary
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Evaluate recall deep into each ranking, streaming results from Solr.")
+    parser.add_argument("--paradigms", nargs="+", default=[BM25_MODE, SEMANTIC_MODE, HYBRID_MODE], choices=PARADIGMS,
+                        help="Paradigms to evaluate")
+    parser.add_argument("--depth", type=int, default=DEFAULT_DEPTH, help="Results read per query")
+    parser.add_argument("--page-size", type=int, default=200, help="Results fetched per cursorMark request")
+    parser.add_argument("--limit", type=int, default=None, help="Only evaluate the first N queries")
+    parser.add_argument("--run-file", action="store_true", help="Also export every result as a TREC run file")
+    parser.add_argument("--output", default=str(DEFAULT_OUTPUT), help="Output path prefix for the CSV/run files")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    k_values = tuple(k for k in K_VALUES if k <= args.depth) or (args.depth,)
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+
+    run_file = open(output.with_suffix(".run"), 'w', newline='', encoding='utf-8') if args.run_file else None
+    try:
+        # BM25-only runs never encode anything, so the model is not loaded for them
+        model = model_loader.get_model() if any(needs_vector(mode) for mode in args.paradigms) else None
+        results = evaluate_deep(model, args.paradigms, args.depth, k_values, args.page_size, run_file, args.limit)
+    finally:
+        if run_file is not None:
+            run_file.close()
+
+    summary = summarize(results, k_values)
+    with open(output.with_suffix(".csv"), 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=list(summary[0].keys()))
+        writer.writeheader()
+        writer.writerows(summary)
+    print(f"[INFO] Summary written to {output.with_suffix('.csv')}")
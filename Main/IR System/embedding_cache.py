@@ -0,0 +1,154 @@
+import os
+import re
+import hashlib
+import threading
+import contextlib
+from pathlib import Path
+import numpy as np
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent / "cache"
+DIGEST_SIZE = hashlib.sha1().digest_size
+
+_path_locks = {}
+_path_locks_lock = threading.Lock()
+
+
+@contextlib.contextmanager
+def file_lock(lock_path):
+    # Serialises writers to one cache file pair: a thread lock per path within the process,
+    # and an OS lock on a side file between processes (e.g. the GUI and a command-line upload)
+    with _path_locks_lock:
+        thread_lock = _path_locks.setdefault(str(lock_path), threading.Lock())
+    with thread_lock, open(lock_path, 'a+b') as f:
+        if os.name == "nt":
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    pass
+        else:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if os.name == "nt":
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class EmbeddingCache:
+    # Vectors are appended as rows of a float32 matrix file, and the index file holds one
+    # sha1 digest of (model name, text) per row in the same order. Several instances may share
+    # the files, so appends hold a lock and first pick up any rows the others have written.
+
+    def __init__(self, model_name, dimension, cache_dir=DEFAULT_CACHE_DIR):
+        self.model_name = model_name
+        self.dimension = dimension
+        cache_dir = Path(cache_dir)
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        file_stem = re.sub(r"[^A-Za-z0-9_.-]", "_", model_name) + f"-{dimension}"
+        self.vectors_path = cache_dir / f"{file_stem}.f32"
+        self.index_path = cache_dir / f"{file_stem}.idx"
+        self.lock_path = cache_dir / f"{file_stem}.lock"
+        self.row_size = dimension * np.dtype(np.float32).itemsize
+        self.rows = {}
+        self.count = 0
+        self.hits = 0
+        self.misses = 0
+        self._matrix = None
+        self._load()
+
+    def _load(self):
+        with file_lock(self.lock_path):
+            self._sync()
+
+    def _sync(self):
+        # Called with the lock held. Reads only the rows added since the last sync.
+        digests_size = self.index_path.stat().st_size if self.index_path.exists() else 0
+        vector_bytes = self.vectors_path.stat().st_size if self.vectors_path.exists() else 0
+        count = min(digests_size // DIGEST_SIZE, vector_bytes // self.row_size)
+
+        # An interrupted write can leave one file longer than the other, so trim both to the rows they share
+        if digests_size != count * DIGEST_SIZE:
+            with open(self.index_path, 'r+b') as f:
+                f.truncate(count * DIGEST_SIZE)
+        if vector_bytes != count * self.row_size:
+            with open(self.vectors_path, 'r+b') as f:
+                f.truncate(count * self.row_size)
+
+        if count > self.count:
+            with open(self.index_path, 'rb') as f:
+                f.seek(self.count * DIGEST_SIZE)
+                digests = f.read((count - self.count) * DIGEST_SIZE)
+            for offset in range(count - self.count):
+                self.rows[digests[offset * DIGEST_SIZE:(offset + 1) * DIGEST_SIZE]] = self.count + offset
+            self.count = count
+            self._matrix = None
+
+    def _stale(self):
+        try:
+            return self.index_path.stat().st_size != self.count * DIGEST_SIZE
+        except FileNotFoundError:
+            return self.count != 0
+
+    def key(self, text):
+        return hashlib.sha1(f"{self.model_name}\0{text}".encode('utf-8')).digest()
+
+    def matrix(self):
+        if self.count == 0:
+            return np.empty((0, self.dimension), dtype=np.float32)
+        if self._matrix is None or self._matrix.shape[0] != self.count:
+            self._matrix = np.memmap(self.vectors_path, dtype=np.float32, mode='r', shape=(self.count, self.dimension))
+        return self._matrix
+
+    def get_many(self, texts):
+        if self._stale():
+            with file_lock(self.lock_path):
+                self._sync()
+        matrix = self.matrix()
+        results = []
+        for text in texts:
+            row = self.rows.get(self.key(text))
+            if row is None:
+                self.misses += 1
+                results.append(None)
+            else:
+                self.hits += 1
+                results.append(matrix[row].tolist())
+        return results
+
+    def put_many(self, texts, vectors):
+        with file_lock(self.lock_path):
+            # Another writer may have appended since this instance last looked; row numbers
+            # must follow on from the files as they are now, not from this instance's count
+            self._sync()
+            new_digests = []
+            new_vectors = []
+            for text, vector in zip(texts, vectors):
+                digest = self.key(text)
+                if digest in self.rows:
+                    continue
+                self.rows[digest] = self.count + len(new_digests)
+                new_digests.append(digest)
+                new_vectors.append(vector)
+            if not new_digests:
+                return
+
+            block = np.asarray(new_vectors, dtype=np.float32).reshape(len(new_vectors), self.dimension)
+            self._matrix = None
+            # Vectors are written before the index so a crash never indexes a row that is not on disk
+            with open(self.vectors_path, 'ab') as f:
+                f.write(block.tobytes())
+            with open(self.index_path, 'ab') as f:
+                f.write(b"".join(new_digests))
+            self.count += len(new_digests)
@@ -0,0 +1,266 @@
+import re
+import sys
+import json
+import time
+import argparse
+from abc import ABC, abstractmethod
+from pathlib import Path
+import numpy as np
+
+
+ENCODER_BACKENDS = ("torch", "torch-int8", "onnx", "onnx-int8")
+DEFAULT_BACKEND = "torch"
+ONNX_DIR = Path(__file__).resolve().parent / "cache" / "onnx"
+ONNX_OPSET = 14
+
+
+class Encoder(ABC):
+    # Everything the search and indexing code needs from a model: encode() with the same
+    # single-text / list behaviour as SentenceTransformer, the vector size and a name that
+    # keeps cached embeddings from different backends apart.
+
+    supports_multi_process = False
+
+    def __init__(self, model_name, backend, threads=None):
+        self.model_name = model_name
+        self.backend = backend
+        self.threads = threads
+        # The reference backend keeps the plain model name so existing caches stay valid
+        self.name = model_name if backend == DEFAULT_BACKEND else f"{model_name}@{backend}"
+
+    @abstractmethod
+    def encode(self, texts, batch_size=32, **kwargs):
+        pass
+
+    @abstractmethod
+    def get_sentence_embedding_dimension(self):
+        pass
+
+
+class TorchEncoder(Encoder):
+    supports_multi_process = True
+
+    def __init__(self, model_name, backend="torch", threads=None):
+        super().__init__(model_name, backend, threads)
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        if threads:
+            torch.set_num_threads(threads)
+        self.model = SentenceTransformer(model_name, device="cpu")
+        if backend == "torch-int8":
+            # Dynamic quantization: Linear weights are stored as int8 and activations are
+            # quantized on the fly, which is where nearly all of BERT's CPU time goes
+            self.model = torch.quantization.quantize_dynamic(self.model, {torch.nn.Linear}, dtype=torch.qint8)
+
+    def encode(self, texts, batch_size=32, **kwargs):
+        return self.model.encode(texts, batch_size=batch_size, **kwargs)
+
+    def get_sentence_embedding_dimension(self):
+        return self.model.get_sentence_embedding_dimension()
+
+    def start_multi_process_pool(self, target_devices=None):
+        return self.model.start_multi_process_pool(target_devices=target_devices)
+
+    def encode_multi_process(self, texts, pool, batch_size=32):
+        return self.model.encode_multi_process(texts, pool, batch_size=batch_size)
+
+    def stop_multi_process_pool(self, pool):
+        self.model.stop_multi_process_pool(pool)
+
+
+def onnx_export_dir(model_name, onnx_dir=ONNX_DIR):
+    return Path(onnx_dir) / re.sub(r"[^A-Za-z0-9_.-]", "_", model_name)
+
+
+def export_onnx(model_name, onnx_dir=ONNX_DIR):
+    # Exports the transformer once; the tokenizer and pooling settings are saved next to it
+    # so later runs need onnxruntime and the tokenizer, but not torch
+    import torch
+    from sentence_transformers import SentenceTransformer
+    from sentence_transformers.models import Normalize, Pooling
+
+    export_dir = onnx_export_dir(model_name, onnx_dir)
+    export_dir.mkdir(parents=True, exist_ok=True)
+    model = SentenceTransformer(model_name, device="cpu")
+    transformer = model[0].auto_model.eval()
+    model.tokenizer.save_pretrained(str(export_dir))
+
+    pooling = next((module for module in model if isinstance(module, Pooling)), None)
+    if pooling is not None and not pooling.pooling_mode_mean_tokens:
+        raise ValueError(f"{model_name} does not use mean pooling, which the ONNX encoder assumes")
+    settings = {
+        "max_seq_length": model.max_seq_length,
+        "normalize": any(isinstance(module, Normalize) for module in model),
+        "dimension": model.get_sentence_embedding_dimension(),
+    }
+
+    sample = model.tokenizer(["export sample"], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+    with torch.no_grad():
+        torch.onnx.export(transformer, tuple(sample[name] for name in input_names), str(export_dir / "model.onnx"),
+                          input_names=input_names, output_names=["last_hidden_state"],
+                          dynamic_axes=dynamic_axes, opset_version=ONNX_OPSET)
+    with open(export_dir / "settings.json", 'w', encoding='utf-8') as f:
+        json.dump(settings, f, indent=2)
+    print(f"[INFO] Exported {model_name} to {export_dir}.")
+    return export_dir
+
+
+def quantize_onnx(export_dir):
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantized_path = Path(export_dir) / "model-int8.onnx"
+    quantize_dynamic(str(Path(export_dir) / "model.onnx"), str(quantized_path), weight_type=QuantType.QInt8)
+    print(f"[INFO] Wrote dynamically quantized model to {quantized_path}.")
+    return quantized_path
+
+
+class OnnxEncoder(Encoder):
+    # Runs the exported transformer with ONNX Runtime and applies the same mean pooling and
+    # normalisation as the sentence-transformers pipeline
+
+    def __init__(self, model_name, backend="onnx", threads=None, onnx_dir=ONNX_DIR):
+        super().__init__(model_name, backend, threads)
+        try:
+            import onnxruntime
+        except ImportError as e:
+            raise ImportError(f"The {backend} backend needs onnxruntime and onnx: pip install -r requirements-onnx.txt") from e
+        from transformers import AutoTokenizer
+
+        export_dir = onnx_export_dir(model_name, onnx_dir)
+        if not (export_dir / "model.onnx").exists():
+            export_onnx(model_name, onnx_dir)
+        model_path = export_dir / "model.onnx"
+        if backend == "onnx-int8":
+            model_path = export_dir / "model-int8.onnx"
+            if not model_path.exists():
+                quantize_onnx(export_dir)
+        with open(export_dir / "settings.json", 'r', encoding='utf-8') as f:
+            self.settings = json.load(f)
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.intra_op_num_threads = threads or 0
+        options.inter_op_num_threads = 1
+        self.session = onnxruntime.InferenceSession(str(model_path), options, providers=["CPUExecutionProvider"])
+        self.input_names = {node.name for node in self.session.get_inputs()}
+        self.tokenizer = AutoTokenizer.from_pretrained(str(export_dir))
+
+    def _encode_batch(self, texts):
+        tokens = self.tokenizer(texts, padding=True, truncation=True, max_length=self.settings["max_seq_length"],
+                                return_tensors="np")
+        feed = {name: tokens[name].astype(np.int64) for name in self.input_names}
+        hidden = self.session.run(["last_hidden_state"], feed)[0]
+        mask = tokens["attention_mask"][..., None].astype(np.float32)
+        vectors = (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+        if self.settings["normalize"]:
+            vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        return vectors.astype(np.float32)
+
+    def encode(self, texts, batch_size=32, **kwargs):
+        if isinstance(texts, str):
+            return self.encode([texts], batch_size)[0]
+        if not texts:
+            return np.empty((0, self.settings["dimension"]), dtype=np.float32)
+        return np.concatenate([self._encode_batch(list(texts[i:i + batch_size]))
+                               for i in range(0, len(texts), batch_size)])
+
+    def get_sentence_embedding_dimension(self):
+        return self.settings["dimension"]
+
+
+def create_encoder(model_name, backend=DEFAULT_BACKEND, threads=None):
+    if backend not in ENCODER_BACKENDS:
+        raise ValueError(f"Unknown encoder backend: {backend}")
+    if backend.startswith("onnx"):
+        return OnnxEncoder(model_name, backend, threads)
+    return TorchEncoder(model_name, backend, threads)
+
+
+PARITY_MIN_COSINE = 0.99
+PARITY_MAX_MAP_DROP = 0.01
+DEFAULT_PARITY_PATH = Path(__file__).resolve().parent / "results" / "encoder_parity.json"
+
+
+def cosine_agreement(reference, candidate):
+    reference = reference / np.maximum(np.linalg.norm(reference, axis=1, keepdims=True), 1e-12)
+    candidate = candidate / np.maximum(np.linalg.norm(candidate, axis=1, keepdims=True), 1e-12)
+    return (reference * candidate).sum(axis=1)
+
+
+def timed_encode(encoder, texts, batch_size=64):
+    start = time.perf_counter()
+    vectors = np.asarray(encoder.encode(texts, batch_size=batch_size), dtype=np.float32)
+    return vectors, len(texts) / (time.perf_counter() - start)
+
+
+def parity_check(model_name, backend, threads=None, min_cosine=PARITY_MIN_COSINE, max_map_drop=PARITY_MAX_MAP_DROP):
+    # Compares a backend with the reference PyTorch model on the Cranfield corpus: per-vector
+    # cosine agreement, encoding throughput and MAP against cranqrel.trec.txt
+    from corpus import iter_documents
+    from evaluation import load_queries, get_qrels
+    from vector_search import LocalVectorIndex
+    from metrics import compute_metrics
+
+    docs = list(iter_documents())
+    texts = [doc["text"] for doc in docs]
+    queries = load_queries(str(Path(__file__).resolve().parent / "cran.qry.xml"))
+    query_texts = [text.replace("⭐", "").strip() for text in queries.values()]
+    qrels = get_qrels()
+    relevant = [qrels.get(qid, set()) for qid in queries]
+
+    report = {"model": model_name, "backend": backend, "threads": threads}
+    results = {}
+    for name in (DEFAULT_BACKEND, backend):
+        encoder = create_encoder(model_name, name, threads)
+        doc_vectors, docs_per_sec = timed_encode(encoder, texts)
+        query_vectors, queries_per_sec = timed_encode(encoder, query_texts)
+        index = LocalVectorIndex([doc["id"] for doc in docs], doc_vectors)
+        rankings = [[doc["id"] for doc in docs] for docs in index.search_batch(query_vectors, 50)]
+        scores = compute_metrics(rankings, relevant, k_values=(10,))
+        map_score, p10 = float(scores["AP"].mean()), float(scores["P@10"].mean())
+        results[name] = (doc_vectors, query_vectors)
+        report[name] = {"docs_per_sec": docs_per_sec, "queries_per_sec": queries_per_sec, "map": map_score, "p@10": p10}
+        print(f"[INFO] {name:<11} {docs_per_sec:>8.1f} docs/sec  {queries_per_sec:>8.1f} queries/sec  "
+              f"MAP={map_score:.4f}  P@10={p10:.4f}")
+
+    agreement = np.concatenate([cosine_agreement(reference, candidate)
+                                for reference, candidate in zip(results[DEFAULT_BACKEND], results[backend])])
+    map_drop = report[DEFAULT_BACKEND]["map"] - report[backend]["map"]
+    report.update({
+        "mean_cosine": float(agreement.mean()), "min_cosine": float(agreement.min()), "map_drop": map_drop,
+        "speedup": report[backend]["docs_per_sec"] / report[DEFAULT_BACKEND]["docs_per_sec"],
+        "min_cosine_threshold": min_cosine, "max_map_drop_threshold": max_map_drop,
+        "passed": bool(agreement.min() >= min_cosine and map_drop <= max_map_drop),
+    })
+    print(f"[INFO] Cosine agreement: mean {report['mean_cosine']:.5f}, min {report['min_cosine']:.5f} "
+          f"(threshold {min_cosine}); MAP change {-map_drop:+.4f} (allowed -{max_map_drop}); "
+          f"{report['speedup']:.2f}x reference throughput.")
+    return report
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Check an encoder backend against the reference PyTorch model.")
+    parser.add_argument("--backend", choices=ENCODER_BACKENDS, default="onnx-int8", help="Backend to check")
+    parser.add_argument("--threads", type=int, default=None, help="Intra-op threads for both backends (default all cores)")
+    parser.add_argument("--min-cosine", type=float, default=PARITY_MIN_COSINE, help="Lowest allowed cosine to the reference vectors")
+    parser.add_argument("--max-map-drop", type=float, default=PARITY_MAX_MAP_DROP, help="Largest allowed MAP loss on the Cranfield qrels")
+    parser.add_argument("--output", default=str(DEFAULT_PARITY_PATH), help="Where the JSON report is written")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    from model_loader import MODEL_NAME
+
+    args = parse_args()
+    parity = parity_check(MODEL_NAME, args.backend, args.threads, args.min_cosine, args.max_map_drop)
+    Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(parity, f, indent=2)
+    if not parity["passed"]:
+        print(f"[ERROR] {args.backend} failed the parity check, see {args.output}")
+        sys.exit(1)
+    print(f"[INFO] {args.backend} passed the parity check. Report written to {args.output}")
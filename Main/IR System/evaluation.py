@@ -0,0 +1,55 @@
+from pathlib import Path
+from functools import lru_cache
+from xml.etree import ElementTree as ET
+from metrics import compute_metrics
+
+
+def load_queries(qry_file="cran.qry.xml"):
+    queries = {}
+    root = ET.parse(qry_file).getroot()
+
+    qrel_path = Path(__file__).resolve().parent / "cranqrel.trec.txt"
+    rel_counts = {}
+    with open(qrel_path, 'r') as f:
+        for line in f:
+            qid, _, _, rel = line.strip().split()
+            if rel == '1':
+                rel_counts[qid] = rel_counts.get(qid, 0) + 1
+
+    # The relevance judgements number queries 1..225 in file order, not by the <num> tag,
+    # which skips values (1, 2, 4, 8, ...), so queries are keyed by position to match them
+    for position, top in enumerate(root.findall("top"), start=1):
+        qid = str(position)
+        title = top.findtext("title").strip().replace('\n', ' ')
+        count = rel_counts.get(qid, 0)
+        marker = "⭐" if count >= 10 else ""
+        queries[qid] = f"{marker} {title}"
+    return queries
+
+
+def load_qrels(qrel_path):
+    qrels = {}
+    with open(qrel_path, 'r') as f:
+        for line in f:
+            qid, _, docid, rel = line.strip().split()
+            qid = qid.strip() 
+            if rel == '1':
+                qrels.setdefault(qid, set()).add(docid)
+    return qrels
+
+
+QREL_PATH = str(Path(__file__).resolve().parent / "cranqrel.trec.txt")
+
+
+@lru_cache(maxsize=None)
+def get_qrels(qrel_path=QREL_PATH):
+    return load_qrels(qrel_path)
+
+
+def evaluate_results(retrieved_ids, relevant_ids, k=50):
+    # Precision is measured at k; recall and average precision use the full ranking
+    results = compute_metrics([retrieved_ids], [relevant_ids], k_values=(k, max(len(retrieved_ids), 1)))
+    precision = float(results[f"P@{k}"][0])
+    recall = float(results[f"R@{max(len(retrieved_ids), 1)}"][0])
+    map_score = float(results["AP"][0])
+    return precision, recall, map_score
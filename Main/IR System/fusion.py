@@ -0,0 +1,117 @@
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from query_builders import BM25_MODE, SEMANTIC_MODE, RESULT_ROWS
+
+
+FUSION_METHODS = ("rrf", "weighted")
+
+_settings = {
+    "method": "rrf",
+    "depth": 100,
+    "rrf_k": 60,
+    "weights": (1.0, 1.0),
+    "sources": (BM25_MODE, SEMANTIC_MODE),
+}
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def configure(**settings):
+    unknown = set(settings) - set(_settings)
+    if unknown:
+        raise ValueError(f"Unknown fusion settings: {', '.join(sorted(unknown))}")
+    if settings.get("method", _settings["method"]) not in FUSION_METHODS:
+        raise ValueError(f"Unknown fusion method: {settings['method']}")
+    _settings.update(settings)
+
+
+def current_settings():
+    return dict(_settings)
+
+
+def reciprocal_rank_fusion(result_lists, weights, rrf_k=60):
+    scores = {}
+    for docs, weight in zip(result_lists, weights):
+        for rank, doc in enumerate(docs, start=1):
+            scores[doc['id']] = scores.get(doc['id'], 0.0) + weight / (rrf_k + rank)
+    return scores
+
+
+def weighted_score_fusion(result_lists, weights):
+    # Scores are min-max normalised per list first, since BM25 and cosine scores use different scales
+    scores = {}
+    for docs, weight in zip(result_lists, weights):
+        if not docs:
+            continue
+        values = [float(doc.get('score', 0.0)) for doc in docs]
+        low, high = min(values), max(values)
+        spread = high - low
+        for doc, value in zip(docs, values):
+            normalized = (value - low) / spread if spread > 0 else 1.0
+            scores[doc['id']] = scores.get(doc['id'], 0.0) + weight * normalized
+    return scores
+
+
+def fuse(result_lists, rows=RESULT_ROWS, method=None, weights=None, rrf_k=None):
+    method = method or _settings["method"]
+    weights = weights or _settings["weights"]
+    if method == "rrf":
+        scores = reciprocal_rank_fusion(result_lists, weights, rrf_k or _settings["rrf_k"])
+    else:
+        scores = weighted_score_fusion(result_lists, weights)
+
+    fields = {}
+    for docs in result_lists:
+        for doc in docs:
+            fields.setdefault(doc['id'], doc)
+    ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:rows]
+    return [{**fields[doc_id], 'score': score} for doc_id, score in ranked]
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="fusion")
+        return _executor
+
+
+def fusion_search(search, query_text, vector, rows=RESULT_ROWS, model=None):
+    # Both retrievals go out at once; `search` is search_backends.search, passed in to avoid a cycle
+    depth = max(_settings["depth"], rows)
+    futures = [_get_executor().submit(search, mode, query_text, vector, depth, model) for mode in _settings["sources"]]
+    return fuse([future.result() for future in futures], rows)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Compare fusion settings for the rank fusion hybrid paradigm.")
+    parser.add_argument("--depth", nargs="+", type=int, default=[50, 100, 200], help="Results fetched from each source")
+    parser.add_argument("--weights", nargs="+", default=["1,1", "1,2", "2,1"], help="BM25,vector weights to try")
+    parser.add_argument("--rrf-k", type=int, default=60, help="RRF rank constant")
+    parser.add_argument("--local", action="store_true", help="Fuse the in-process BM25 and vector engines instead of Solr")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    from model_loader import get_model
+    from query_builders import FUSION_MODE, HYBRID_MODE, BM25_LOCAL_MODE, SEMANTIC_LOCAL_MODE
+    import batch_evaluate
+
+    args = parse_args()
+    if args.local:
+        configure(sources=(BM25_LOCAL_MODE, SEMANTIC_LOCAL_MODE))
+    bert_model = get_model()
+
+    summaries = []
+    if not args.local:
+        _, summary = batch_evaluate.run_batch(bert_model, paradigms=[HYBRID_MODE], k_values=(10, 50))
+        summaries.extend({**row, "paradigm": "Solr rerank"} for row in summary)
+    for method in FUSION_METHODS:
+        for depth in args.depth:
+            for weights in args.weights:
+                configure(method=method, depth=depth, rrf_k=args.rrf_k,
+                          weights=tuple(float(w) for w in weights.split(",")))
+                _, summary = batch_evaluate.run_batch(bert_model, paradigms=[FUSION_MODE], k_values=(10, 50))
+                summaries.extend({**row, "paradigm": f"{method} depth={depth} weights={weights}"} for row in summary)
+    batch_evaluate.print_summary(summaries)
@@ -0,0 +1,72 @@
+import os
+import json
+import hashlib
+from pathlib import Path
+
+
+DEFAULT_MANIFEST_DIR = Path(__file__).resolve().parent / "cache"
+FINGERPRINT_FIELDS = ("id", "title", "author", "text")
+
+
+def document_fingerprint(doc, model_name):
+    # The model name is included so switching encoders re-sends every vector
+    hasher = hashlib.sha1(model_name.encode('utf-8'))
+    for field in FINGERPRINT_FIELDS:
+        hasher.update(b"\0")
+        hasher.update(str(doc.get(field, "")).encode('utf-8'))
+    return hasher.hexdigest()
+
+
+def corpus_fingerprint(docs, model_name):
+    # One digest over every document's fingerprint, for files built from the whole corpus
+    hasher = hashlib.sha1()
+    for doc in docs:
+        hasher.update(document_fingerprint(doc, model_name).encode('ascii'))
+    return hasher.hexdigest()
+
+
+class IndexManifest:
+    # Records a fingerprint per indexed docno so a later run can tell which documents were
+    # added, changed or removed since the last successful commit.
+
+    def __init__(self, collection_name, model_name, manifest_dir=DEFAULT_MANIFEST_DIR):
+        self.model_name = model_name
+        manifest_dir = Path(manifest_dir)
+        manifest_dir.mkdir(parents=True, exist_ok=True)
+        self.path = manifest_dir / f"{collection_name}-manifest.json"
+        self.indexed = self._load()
+        self.seen = {}
+
+    def _load(self):
+        if not self.path.exists():
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f).get("documents", {})
+        except (OSError, ValueError) as e:
+            print(f"[INFO] Ignoring unreadable index manifest: {e}")
+            return {}
+
+    def fingerprint(self, doc):
+        return document_fingerprint(doc, self.model_name)
+
+    def track(self, docs, skip_unchanged=True):
+        for doc in docs:
+            fingerprint = self.fingerprint(doc)
+            self.seen[doc["id"]] = fingerprint
+            if not skip_unchanged or self.indexed.get(doc["id"]) != fingerprint:
+                yield doc
+
+    def removed_ids(self):
+        return [doc_id for doc_id in self.indexed if doc_id not in self.seen]
+
+    def save(self, failed_ids=()):
+        # Failed documents are left out so the next run sends them again
+        failed_ids = set(failed_ids)
+        documents = {doc_id: fp for doc_id, fp in self.seen.items() if doc_id not in failed_ids}
+        temp_path = self.path.with_suffix(".tmp")
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({"model": self.model_name, "documents": documents}, f)
+        os.replace(temp_path, self.path)
+        self.indexed = documents
+        self.seen = {}
@@ -0,0 +1,128 @@
+import json
+import time
+import threading
+import contextlib
+import contextvars
+from pathlib import Path
+from collections import deque
+import numpy as np
+
+
+STAGES = ("encode", "request", "parse", "search", "evaluate", "render", "total")
+WINDOW_SIZE = 1000
+QUANTILES = (0.5, 0.95, 0.99)
+DEFAULT_EXPORT_PATH = Path(__file__).resolve().parent / "results" / "latency"
+NO_PARADIGM = "-"
+
+# Set by search_backends for the duration of a search, so lower layers such as solr_client
+# can attribute their spans without being passed the paradigm
+_current_paradigm = contextvars.ContextVar("paradigm", default=NO_PARADIGM)
+
+
+class RollingHistogram:
+    # The last `window` durations feed the percentiles and the rate; count and sum are
+    # cumulative, as Prometheus summaries expect
+
+    def __init__(self, window=WINDOW_SIZE):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.sum = 0.0
+
+    def add(self, seconds, timestamp):
+        self.samples.append((timestamp, seconds))
+        self.count += 1
+        self.sum += seconds
+
+    def summary(self, now):
+        durations = np.array([seconds for _, seconds in self.samples])
+        percentiles = np.quantile(durations, QUANTILES) if len(durations) else np.zeros(len(QUANTILES))
+        elapsed = now - self.samples[0][0] if self.samples else 0.0
+        return {
+            "count": self.count,
+            "sum_seconds": self.sum,
+            "window": len(durations),
+            "mean_ms": float(durations.mean() * 1000) if len(durations) else 0.0,
+            **{f"p{int(q * 100)}_ms": float(p * 1000) for q, p in zip(QUANTILES, percentiles)},
+            "per_sec": len(durations) / elapsed if elapsed > 0 else 0.0,
+        }
+
+
+class Recorder:
+    def __init__(self, window=WINDOW_SIZE):
+        self.window = window
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds, paradigm=None):
+        key = (stage, paradigm or _current_paradigm.get())
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = RollingHistogram(self.window)
+            histogram.add(seconds, time.monotonic())
+
+    @contextlib.contextmanager
+    def span(self, stage, paradigm=None):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start, paradigm)
+
+    def snapshot(self):
+        now = time.monotonic()
+        with self._lock:
+            rows = [{"stage": stage, "paradigm": paradigm, **histogram.summary(now)}
+                    for (stage, paradigm), histogram in self._histograms.items()]
+        order = {stage: i for i, stage in enumerate(STAGES)}
+        return sorted(rows, key=lambda row: (row["paradigm"], order.get(row["stage"], len(order))))
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+    def to_json(self):
+        return json.dumps({"quantiles": list(QUANTILES), "window": self.window, "spans": self.snapshot()}, indent=2)
+
+    def to_prometheus(self):
+        lines = ["# HELP ir_stage_latency_seconds Search pipeline stage latency over the recent window.",
+                 "# TYPE ir_stage_latency_seconds summary"]
+        for row in self.snapshot():
+            labels = f'stage="{row["stage"]}",paradigm="{_escape_label(row["paradigm"])}"'
+            for q in QUANTILES:
+                lines.append(f'ir_stage_latency_seconds{{{labels},quantile="{q}"}} {row[f"p{int(q * 100)}_ms"] / 1000:.6f}')
+            lines.append(f"ir_stage_latency_seconds_sum{{{labels}}} {row['sum_seconds']:.6f}")
+            lines.append(f"ir_stage_latency_seconds_count{{{labels}}} {row['count']}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, path_prefix=DEFAULT_EXPORT_PATH):
+        path_prefix = Path(path_prefix)
+        path_prefix.parent.mkdir(parents=True, exist_ok=True)
+        json_path, prom_path = path_prefix.with_suffix(".json"), path_prefix.with_suffix(".prom")
+        json_path.write_text(self.to_json(), encoding='utf-8')
+        prom_path.write_text(self.to_prometheus(), encoding='utf-8')
+        return json_path, prom_path
+
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+RECORDER = Recorder()
+
+
+def span(stage, paradigm=None):
+    return RECORDER.span(stage, paradigm)
+
+
+def record(stage, seconds, paradigm=None):
+    RECORDER.record(stage, seconds, paradigm)
+
+
+@contextlib.contextmanager
+def paradigm(mode):
+    token = _current_paradigm.set(mode)
+    try:
+        yield
+    finally:
+        _current_paradigm.reset(token)
@@ -0,0 +1,111 @@
+import numpy as np
+
+
+def normalize_id(doc_id):
+    doc_id = str(doc_id).strip()
+    return int(doc_id) if doc_id.isdigit() else -1
+
+
+def to_id_array(ids):
+    # Parsed once into integers; repeated ids keep only their first (best) rank
+    seen = set()
+    parsed = []
+    for doc_id in ids:
+        value = normalize_id(doc_id)
+        if value in seen:
+            value = -1
+        elif value != -1:
+            seen.add(value)
+        parsed.append(value)
+    return np.array(parsed, dtype=np.int64)
+
+
+def relevance_matrix(retrieved_lists, relevant_sets, depth=None):
+    # Row q, column i is True when the document at rank i + 1 for query q is relevant
+    id_arrays = [to_id_array(ids) for ids in retrieved_lists]
+    depth = depth or max((len(ids) for ids in id_arrays), default=0)
+    retrieved = np.full((len(id_arrays), max(depth, 1)), -1, dtype=np.int64)
+    for row, ids in enumerate(id_arrays):
+        ids = ids[:depth]
+        retrieved[row, :len(ids)] = ids
+
+    hits = np.zeros(retrieved.shape, dtype=bool)
+    num_relevant = np.zeros(len(id_arrays), dtype=np.int64)
+    for row, relevant in enumerate(relevant_sets):
+        relevant_ids = np.unique(to_id_array(relevant))
+        relevant_ids = relevant_ids[relevant_ids >= 0]
+        num_relevant[row] = len(relevant_ids)
+        hits[row] = np.isin(retrieved[row], relevant_ids)
+    return hits, num_relevant
+
+
+def compute_metrics(retrieved_lists, relevant_sets, k_values=(10,)):
+    hits, num_relevant = relevance_matrix(retrieved_lists, relevant_sets)
+    depth = hits.shape[1]
+    ranks = np.arange(1, depth + 1)
+    cumulative = np.cumsum(hits, axis=1)
+    has_relevant = num_relevant > 0
+    safe_relevant = np.maximum(num_relevant, 1)
+
+    results = {}
+    discounts = 1.0 / np.log2(ranks + 1)
+    ideal_gains = np.concatenate(([0.0], np.cumsum(1.0 / np.log2(np.arange(2, max(depth, max(k_values)) + 2)))))
+    for k in k_values:
+        found = cumulative[:, min(k, depth) - 1]
+        results[f"P@{k}"] = found / k
+        results[f"R@{k}"] = np.where(has_relevant, found / safe_relevant, 0.0)
+        dcg = (hits[:, :k] * discounts[:k]).sum(axis=1)
+        ideal = ideal_gains[np.minimum(num_relevant, k)]
+        results[f"nDCG@{k}"] = np.divide(dcg, ideal, out=np.zeros_like(dcg), where=ideal > 0)
+
+    results["AP"] = np.where(has_relevant, (hits * (cumulative / ranks)).sum(axis=1) / safe_relevant, 0.0)
+
+    first_hit = np.argmax(hits, axis=1)
+    results["MRR"] = np.where(hits.any(axis=1), 1.0 / (first_hit + 1), 0.0)
+
+    # R-precision reads precision at rank R, the number of relevant documents for that query
+    r_cutoff = np.clip(num_relevant, 1, depth) - 1
+    found_at_r = cumulative[np.arange(len(num_relevant)), r_cutoff]
+    results["R-Prec"] = np.where(has_relevant, found_at_r / safe_relevant, 0.0)
+    return results
+
+
+def streaming_metrics(doc_ids, relevant_ids, k_values=(10,)):
+    # Same definitions as compute_metrics for one query, read from an iterator of ids in rank
+    # order; only the relevant ids already found are kept, so the ranking can be any depth
+    relevant = set(int(i) for i in to_id_array(relevant_ids) if i >= 0)
+    found = set()
+    precision_sum = 0.0
+    first_hit = 0
+    found_at_r = 0
+    found_at, dcg_at = {}, {}
+    rank = 0
+    for rank, doc_id in enumerate(doc_ids, start=1):
+        doc_id = normalize_id(doc_id)
+        if doc_id in relevant and doc_id not in found:
+            found.add(doc_id)
+            precision_sum += len(found) / rank
+            first_hit = first_hit or rank
+            for k in k_values:
+                if rank <= k:
+                    dcg_at[k] = dcg_at.get(k, 0.0) + 1.0 / np.log2(rank + 1)
+        if rank in k_values:
+            found_at[rank] = len(found)
+        if rank == max(len(relevant), 1):
+            found_at_r = len(found)
+    if rank < max(len(relevant), 1):
+        found_at_r = len(found)
+
+    num_relevant = len(relevant)
+    results = {}
+    for k in k_values:
+        hits = found_at.get(k, len(found))
+        ideal = float(np.sum(1.0 / np.log2(np.arange(2, min(num_relevant, k) + 2))))
+        results[f"P@{k}"] = hits / k
+        results[f"R@{k}"] = hits / num_relevant if num_relevant else 0.0
+        results[f"nDCG@{k}"] = dcg_at.get(k, 0.0) / ideal if ideal > 0 else 0.0
+    results["AP"] = precision_sum / num_relevant if num_relevant else 0.0
+    results["MRR"] = 1.0 / first_hit if first_hit else 0.0
+    results["R-Prec"] = found_at_r / num_relevant if num_relevant else 0.0
+    results["depth"] = rank
+    return results
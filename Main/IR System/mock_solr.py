@@ -0,0 +1,258 @@
+import re
+import json
+import time
+import argparse
+import threading
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+from corpus import iter_documents
+from query_builders import BM25_MODE, SEMANTIC_MODE, HYBRID_MODE, RERANK_DOCS, RERANK_WEIGHT, build_params
+
+
+DEFAULT_RECORDINGS_PATH = Path(__file__).resolve().parent / "cache" / "solr_recordings.json"
+RECORDED_MODES = (BM25_MODE, SEMANTIC_MODE, HYBRID_MODE)
+VECTOR_PATTERN = re.compile(r"\[([^\]]*)\]")
+TOP_K_PATTERN = re.compile(r"topK=\d+")
+# Deep enough for the rank fusion sources; shorter requests get the head of the recorded list
+RECORD_ROWS = 100
+
+
+def split_vector(params):
+    # Query vectors are replaced by a placeholder in the lookup key and matched by cosine
+    # instead, so recordings survive the last-digit differences between encoder runs.
+    # Paging and field lists are left out too: one deep recording answers any page of the
+    # same query, and stored fields are filled in from the corpus.
+    vector = None
+    stripped = {}
+    for name, value in params.items():
+        if name in ("rows", "start", "fl", "sort", "cursorMark"):
+            continue
+        if isinstance(value, str) and "{!knn" in value:
+            match = VECTOR_PATTERN.search(value)
+            if match and vector is None:
+                vector = [float(x) for x in match.group(1).split(",") if x]
+            value = TOP_K_PATTERN.sub("topK=*", VECTOR_PATTERN.sub("[]", value))
+        stripped[name] = value
+    return json.dumps(stripped, sort_keys=True), vector
+
+
+def make_entry(params, docs):
+    key, vector = split_vector(params)
+    return {"key": key, "vector": vector, "docs": [{"id": str(doc["id"]), "score": float(doc.get("score", 0.0))} for doc in docs]}
+
+
+def record_solr(queries, vectors, rows=RECORD_ROWS, modes=RECORDED_MODES):
+    # Replays the benchmark queries against a running Solr and keeps ids and scores
+    import solr_client
+
+    entries = []
+    for (_, text), vector in zip(queries, vectors):
+        for mode in modes:
+            params = build_params(mode, text, vector, rows=rows)
+            entries.append(make_entry(params, solr_client.select(params)))
+    return entries
+
+
+def record_local(queries, vectors, vector_index, bm25_index, rows=RECORD_ROWS, modes=RECORDED_MODES):
+    # Stand-in recordings from the in-process engines, for machines that have never run Solr.
+    # The hybrid entry mirrors Solr's rerank: BM25 top RERANK_DOCS re-scored with the knn score.
+    rows_by_id = {doc_id: i for i, doc_id in enumerate(vector_index.doc_ids)}
+    entries = []
+    for (_, text), vector in zip(queries, vectors):
+        for mode in modes:
+            if mode == BM25_MODE:
+                docs = bm25_index.search(text, rows)
+            elif mode == SEMANTIC_MODE:
+                docs = vector_index.search(vector, rows)
+            else:
+                candidates = bm25_index.search(text, max(rows, RERANK_DOCS))
+                query = vector / max(np.linalg.norm(vector), 1e-12)
+                for doc in candidates[:RERANK_DOCS]:
+                    similarity = float(vector_index.matrix[rows_by_id[doc["id"]]] @ query)
+                    doc["score"] += RERANK_WEIGHT * (1.0 + similarity) / 2.0
+                docs = sorted(candidates, key=lambda doc: doc["score"], reverse=True)[:rows]
+            entries.append(make_entry(build_params(mode, text, vector, rows=rows), docs))
+    return entries
+
+
+def save_recordings(entries, path=DEFAULT_RECORDINGS_PATH):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(entries, f)
+    print(f"[INFO] Saved {len(entries)} recorded responses to {path}")
+
+
+def cursor_offset(cursor_mark):
+    # Real cursor marks encode the sort values of the last document; the stand-in only needs the offset
+    return 0 if cursor_mark == "*" else int(cursor_mark.rsplit("-", 1)[-1])
+
+
+class RecordedResponses:
+    def __init__(self, entries, documents=None):
+        self.documents = documents or {}
+        self.entries = {}
+        for entry in entries:
+            self.entries.setdefault(entry["key"], []).append(entry)
+        self.vectors = {}
+        for key, group in self.entries.items():
+            if group[0]["vector"] is not None:
+                matrix = np.array([entry["vector"] for entry in group], dtype=np.float32)
+                self.vectors[key] = matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+
+    @classmethod
+    def load(cls, path=DEFAULT_RECORDINGS_PATH, xml_path=None):
+        with open(path, 'r', encoding='utf-8') as f:
+            entries = json.load(f)
+        docs = iter_documents(xml_path) if xml_path else iter_documents()
+        return cls(entries, {doc["id"]: doc for doc in docs})
+
+    def lookup(self, params):
+        key, vector = split_vector(params)
+        group = self.entries.get(key)
+        if not group:
+            return None, 0
+        if vector is None or key not in self.vectors:
+            entry = group[0]
+        else:
+            query = np.asarray(vector, dtype=np.float32)
+            entry = group[int(np.argmax(self.vectors[key] @ query))]
+
+        fields = [field.strip() for field in str(params.get("fl", "id,score")).split(",")]
+        start = cursor_offset(params["cursorMark"]) if "cursorMark" in params else int(params.get("start", 0))
+        docs = []
+        for recorded in entry["docs"][start:start + int(params.get("rows", 10))]:
+            doc = self.documents.get(recorded["id"], {})
+            docs.append({field: recorded[field] if field in recorded else doc.get(field, "") for field in fields})
+        return docs, len(entry["docs"])
+
+
+class MockSolrHandler(BaseHTTPRequestHandler):
+    def _reply(self, status, body):
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        if "/admin/info/system" in self.path:
+            self._reply(200, {"responseHeader": {"status": 0}, "mode": "mock"})
+        elif "/admin/collections" in self.path and "action=CLUSTERSTATUS" in self.path:
+            # One shard covering the whole hash range, led by this server
+            name = parse_qs(urlsplit(self.path).query).get("collection", [self.server.collection_name])[0]
+            leader = {"core": name, "base_url": self.server.base_url, "state": "active", "leader": "true"}
+            shard = {"range": "80000000-7fffffff", "state": "active", "replicas": {"core_node1": leader}}
+            self._reply(200, {"responseHeader": {"status": 0}, "cluster": {
+                "live_nodes": ["mock"],
+                "collections": {name: {"router": {"name": "compositeId"}, "shards": {"shard1": shard}}}}})
+        elif "/admin/collections" in self.path:
+            self._reply(200, {"responseHeader": {"status": 0}, "collections": [self.server.collection_name]})
+        else:
+            self._reply(404, {"error": {"msg": f"Not recorded: GET {self.path}", "code": 404}})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        if self.path.endswith("/select"):
+            if self.server.latency:
+                time.sleep(self.server.latency)
+            params = body.get("params", {})
+            docs, found = self.server.responses.lookup(params)
+            if docs is None:
+                self._reply(404, {"error": {"msg": "No recorded response for these parameters", "code": 404}})
+            elif "cursorMark" in params:
+                offset = cursor_offset(params["cursorMark"]) + len(docs)
+                self._reply(200, {"responseHeader": {"status": 0}, "nextCursorMark": f"mock-{offset}" if docs else params["cursorMark"],
+                                  "response": {"numFound": found, "start": 0, "docs": docs}})
+            else:
+                self._reply(200, {"responseHeader": {"status": 0},
+                                  "response": {"numFound": found, "start": int(params.get("start", 0)), "docs": docs}})
+        elif self.path.endswith("/update"):
+            if isinstance(body, list):
+                with self.server.lock:
+                    self.server.documents_received += len(body)
+            self._reply(200, {"responseHeader": {"status": 0}})
+        else:
+            self._reply(404, {"error": {"msg": f"Not recorded: POST {self.path}", "code": 404}})
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MockSolrServer:
+    # Serves recorded /select responses and accepts /update requests on localhost, so the
+    # search and ingestion paths can be timed without Java, ZooKeeper or Solr
+
+    def __init__(self, responses, collection_name="research-papers", port=0, latency_ms=0.0):
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), MockSolrHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.responses = responses
+        self.httpd.collection_name = collection_name
+        self.httpd.latency = latency_ms / 1000.0
+        self.httpd.lock = threading.Lock()
+        self.httpd.documents_received = 0
+        self.collection_name = collection_name
+        self.httpd.base_url = self.url
+        self.thread = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}/solr"
+
+    @property
+    def select_url(self):
+        return f"{self.url}/{self.collection_name}/select"
+
+    @property
+    def documents_received(self):
+        return self.httpd.documents_received
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="mock-solr", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Record Solr responses or serve them from a stand-in Solr server.")
+    parser.add_argument("--record", action="store_true", help="Record responses from the running Solr instance")
+    parser.add_argument("--record-local", action="store_true", help="Build stand-in recordings from the in-process engines")
+    parser.add_argument("--recordings", default=str(DEFAULT_RECORDINGS_PATH), help="Recorded responses file")
+    parser.add_argument("--port", type=int, default=8990, help="Port to serve on")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Delay added to every /select response")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.record or args.record_local:
+        from model_loader import get_model
+        from batch_evaluate import load_query_texts
+
+        queries = load_query_texts()
+        query_vectors = get_model().encode([text for _, text in queries], batch_size=64)
+        if args.record:
+            recorded = record_solr(queries, query_vectors)
+        else:
+            from vector_search import get_vector_index
+            from bm25_index import get_bm25_index
+            recorded = record_local(queries, query_vectors, get_vector_index(get_model()), get_bm25_index())
+        save_recordings(recorded, args.recordings)
+    else:
+        server = MockSolrServer(RecordedResponses.load(args.recordings), port=args.port, latency_ms=args.latency_ms)
+        print(f"[INFO] Serving recorded responses at {server.url}")
+        server.httpd.serve_forever()
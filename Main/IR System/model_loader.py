@@ -0,0 +1,62 @@
+import threading
+from encoders import DEFAULT_BACKEND, ENCODER_BACKENDS, create_encoder
+
+
+MODEL_NAME = 'all-MiniLM-L6-v2'
+
+_settings = {
+    "backend": DEFAULT_BACKEND,
+    "threads": None,
+}
+_model = None
+_model_lock = threading.Lock()
+_warmup_thread = None
+
+
+def configure(**settings):
+    unknown = set(settings) - set(_settings)
+    if unknown:
+        raise ValueError(f"Unknown encoder settings: {', '.join(sorted(unknown))}")
+    if settings.get("backend", _settings["backend"]) not in ENCODER_BACKENDS:
+        raise ValueError(f"Unknown encoder backend: {settings['backend']}")
+    if _model is not None and any(_settings[key] != value for key, value in settings.items()):
+        raise RuntimeError("The encoder is already loaded; configure it before the first encode")
+    _settings.update(settings)
+
+
+def get_model():
+    # One model per process: the GUI, the indexing script it runs and the
+    # evaluation tools all share it. torch and onnxruntime are only imported here.
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                _model = create_encoder(MODEL_NAME, _settings["backend"], _settings["threads"])
+                print(f"[INFO] Loaded {MODEL_NAME} with the {_settings['backend']} encoder backend.")
+    return _model
+
+
+def warm_up_in_background(on_ready=None):
+    global _warmup_thread
+
+    def warm_up():
+        try:
+            get_model().encode("warm up")
+        except Exception as e:
+            # Not fatal: the first search will try to load the model again and report the error
+            print(f"[ERROR] Background model load failed: {e}")
+            return
+        if on_ready is not None:
+            on_ready()
+
+    if _warmup_thread is None:
+        _warmup_thread = threading.Thread(target=warm_up, name="model-warmup", daemon=True)
+        _warmup_thread.start()
+    return _warmup_thread
+
+
+class LazyModel:
+    # Stands in for the model at import time; the real one is created on first attribute use
+
+    def __getattr__(self, name):
+        return getattr(get_model(), name)
@@ -0,0 +1,190 @@
+import json
+import argparse
+from pathlib import Path
+import numpy as np
+from vector_search import LocalVectorIndex, normalize_rows, top_k_indices
+from metrics import compute_metrics
+
+
+PQ_CENTROIDS = 256
+PQ_ITERATIONS = 15
+DEFAULT_REPORT_PATH = Path(__file__).resolve().parent / "results" / "quantization_report.json"
+CONFIGURATIONS = [
+    ("int8 scalar", {"method": "sq"}),
+    ("int8 scalar + rescore", {"method": "sq", "rescore": 200}),
+    ("PQ 96x8", {"method": "pq", "subspaces": 96}),
+    ("PQ 48x8", {"method": "pq", "subspaces": 48}),
+    ("PQ 48x8 + rescore", {"method": "pq", "subspaces": 48, "rescore": 200}),
+    ("PQ 24x8", {"method": "pq", "subspaces": 24}),
+]
+
+
+class ScalarQuantizer:
+    # Maps every dimension linearly from its [min, max] range onto the 256 levels of a uint8
+
+    def __init__(self, vectors):
+        self.minimum = vectors.min(axis=0).astype(np.float32)
+        self.scale = np.maximum((vectors.max(axis=0) - self.minimum) / 255.0, 1e-12).astype(np.float32)
+
+    def encode(self, vectors):
+        return np.clip(np.rint((vectors - self.minimum) / self.scale), 0, 255).astype(np.uint8)
+
+    def decode(self, codes):
+        return codes.astype(np.float32) * self.scale + self.minimum
+
+    def scores(self, codes, query):
+        # q . (codes * scale + minimum) without decoding the matrix back to float
+        return codes.astype(np.float32) @ (query * self.scale) + float(self.minimum @ query)
+
+    def nbytes(self, codes):
+        return codes.nbytes + self.minimum.nbytes + self.scale.nbytes
+
+
+def kmeans(vectors, n_centroids, iterations=PQ_ITERATIONS, seed=0):
+    rng = np.random.default_rng(seed)
+    n_centroids = min(n_centroids, len(vectors))
+    centroids = vectors[rng.choice(len(vectors), size=n_centroids, replace=False)].copy()
+    for _ in range(iterations):
+        distances = (vectors ** 2).sum(axis=1, keepdims=True) - 2 * vectors @ centroids.T + (centroids ** 2).sum(axis=1)
+        assignments = np.argmin(distances, axis=1)
+        counts = np.bincount(assignments, minlength=n_centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, vectors)
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]
+    return centroids
+
+
+class ProductQuantizer:
+    # Splits vectors into sub-vectors and stores the id of the nearest sub-centroid for each,
+    # so a 384-dim float vector becomes one byte per subspace.
+
+    def __init__(self, vectors, subspaces=48, n_centroids=PQ_CENTROIDS, seed=0):
+        if vectors.shape[1] % subspaces:
+            raise ValueError(f"Vector dimension {vectors.shape[1]} is not divisible by {subspaces} subspaces")
+        self.subspaces = subspaces
+        self.sub_dimension = vectors.shape[1] // subspaces
+        self.codebooks = np.stack([
+            kmeans(self._split(vectors)[:, j], n_centroids, seed=seed + j) for j in range(subspaces)
+        ]).astype(np.float32)
+
+    def _split(self, vectors):
+        return vectors.reshape(len(vectors), self.subspaces, self.sub_dimension)
+
+    def encode(self, vectors):
+        parts = self._split(vectors)
+        codes = np.empty((len(vectors), self.subspaces), dtype=np.uint8)
+        for j in range(self.subspaces):
+            codebook = self.codebooks[j]
+            distances = -2 * parts[:, j] @ codebook.T + (codebook ** 2).sum(axis=1)
+            codes[:, j] = np.argmin(distances, axis=1)
+        return codes
+
+    def decode(self, codes):
+        return self.codebooks[np.arange(self.subspaces), codes].reshape(len(codes), -1)
+
+    def scores(self, codes, query):
+        # Asymmetric distance: the query stays exact and is compared to every centroid once,
+        # then each document score is a sum of table lookups
+        table = np.einsum('jkd,jd->jk', self.codebooks, query.reshape(self.subspaces, self.sub_dimension))
+        return table[np.arange(self.subspaces), codes].sum(axis=1)
+
+    def nbytes(self, codes):
+        return codes.nbytes + self.codebooks.nbytes
+
+
+class QuantizedVectorIndex(LocalVectorIndex):
+    # Searches compressed codes. With rescore > 0 the best candidates are re-ranked using the
+    # full float vectors, which must then be kept alongside the codes.
+
+    def __init__(self, doc_ids, vectors, documents=None, method="sq", subspaces=48, rescore=0):
+        super().__init__(doc_ids, vectors, documents)
+        self.method = method
+        self.rescore = rescore
+        if method == "sq":
+            self.quantizer = ScalarQuantizer(self.matrix)
+        elif method == "pq":
+            self.quantizer = ProductQuantizer(self.matrix, subspaces=subspaces)
+        else:
+            raise ValueError(f"Unknown quantization method: {method}")
+        self.codes = self.quantizer.encode(self.matrix)
+        if not rescore:
+            self.matrix = None
+
+    @classmethod
+    def from_index(cls, index, **kwargs):
+        return cls(index.doc_ids, index.matrix, index.documents, **kwargs)
+
+    def nbytes(self):
+        full_vectors = self.matrix.nbytes if self.matrix is not None else 0
+        return self.quantizer.nbytes(self.codes) + full_vectors
+
+    def search_batch(self, query_vectors, top_k=50):
+        results = []
+        for query in normalize_rows(np.atleast_2d(query_vectors)):
+            scores = self.quantizer.scores(self.codes, query)
+            if self.rescore:
+                candidates = top_k_indices(scores, max(self.rescore, top_k))
+                exact = self.matrix[candidates] @ query
+                best = candidates[top_k_indices(exact, top_k)]
+                similarities = self.matrix[best] @ query
+            else:
+                best = top_k_indices(scores, top_k)
+                similarities = scores[best]
+            results.append([self.to_result(int(i), float(s)) for i, s in zip(best, similarities)])
+        return results
+
+
+def mean_average_precision(index, query_vectors, relevant_sets, top_k=50):
+    results = index.search_batch(query_vectors, top_k)
+    scores = compute_metrics([[doc["id"] for doc in docs] for docs in results], relevant_sets, k_values=(10,))
+    return float(scores["AP"].mean()), float(scores["P@10"].mean())
+
+
+def quantization_report(index, query_vectors, relevant_sets, configurations, top_k=50):
+    float_bytes = index.matrix.nbytes
+    baseline_map, baseline_p10 = mean_average_precision(index, query_vectors, relevant_sets, top_k)
+    report = [{"name": "float32", "bytes": float_bytes, "bytes_per_document": index.matrix[0].nbytes,
+               "compression": 1.0, "map": baseline_map, "p@10": baseline_p10, "map_loss": 0.0}]
+    print(f"[INFO] {'float32':<22} {float_bytes / 1024:>9.1f} KB  {index.matrix[0].nbytes:>5} B/doc  "
+          f"MAP={baseline_map:.4f}  P@10={baseline_p10:.4f}")
+
+    for name, options in configurations:
+        quantized = QuantizedVectorIndex.from_index(index, **options)
+        # Rescoring keeps the full float matrix in memory next to the codes, and is charged for it
+        code_bytes = quantized.nbytes()
+        map_score, p10 = mean_average_precision(quantized, query_vectors, relevant_sets, top_k)
+        # Per-document size leaves out the fixed codebook cost, which is what matters at scale
+        per_document = quantized.codes[0].nbytes + (quantized.matrix[0].nbytes if quantized.matrix is not None else 0)
+        report.append({"name": name, "bytes": code_bytes, "bytes_per_document": per_document,
+                       "compression": float_bytes / code_bytes, "map": map_score, "p@10": p10,
+                       "map_loss": baseline_map - map_score})
+        print(f"[INFO] {name:<22} {code_bytes / 1024:>9.1f} KB  {per_document:>5} B/doc  MAP={map_score:.4f}  P@10={p10:.4f}  "
+              f"({float_bytes / code_bytes:.2f}x compression, MAP change {map_score - baseline_map:+.4f})")
+    return report
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Compare memory use and MAP of quantized document vectors.")
+    parser.add_argument("--output", default=str(DEFAULT_REPORT_PATH), help="Where the JSON report is written")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    from model_loader import get_model
+    from evaluation import load_queries, get_qrels
+
+    args = parse_args()
+
+    bert_model = get_model()
+    float_index = LocalVectorIndex.from_corpus(bert_model)
+    queries = load_queries(str(Path(__file__).resolve().parent / "cran.qry.xml"))
+    query_vectors = bert_model.encode([text.replace("⭐", "").strip() for text in queries.values()], batch_size=64)
+    qrels = get_qrels()
+    relevant = [qrels.get(qid, set()) for qid in queries]
+
+    results = quantization_report(float_index, query_vectors, relevant, CONFIGURATIONS)
+    Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"[INFO] Report written to {args.output}")
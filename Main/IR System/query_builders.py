@@ -0,0 +1,61 @@
+import numpy as np
+
+
+BM25_MODE = "BM25 Paradigm"
+SEMANTIC_MODE = "Semantic Paradigm (Vectors)"
+HYBRID_MODE = "Hybrid Paradigm (BM25 + Vector)"
+SEMANTIC_LOCAL_MODE = "Semantic Paradigm (Local Vectors)"
+BM25_LOCAL_MODE = "BM25 Paradigm (Local Index)"
+FUSION_MODE = "Hybrid Paradigm (Rank Fusion)"
+PARADIGMS = [BM25_MODE, SEMANTIC_MODE, HYBRID_MODE, SEMANTIC_LOCAL_MODE, BM25_LOCAL_MODE, FUSION_MODE]
+
+RESULT_FIELDS = 'id,title,score,abstract'
+# Paged results leave the abstract out; it is fetched when a row is opened
+PAGE_FIELDS = 'id,title,score'
+RESULT_ROWS = 50
+PAGE_SIZE = 50
+PAGE_DEPTH = 1000
+VECTOR_PRECISION = 6
+RERANK_DOCS = 100
+RERANK_WEIGHT = 100.0
+
+
+def format_vector(vector, precision=VECTOR_PRECISION):
+    # Rounding happens in one NumPy call; repr gives the shortest text for each rounded value
+    rounded = np.round(np.asarray(vector, dtype=np.float64).ravel(), precision)
+    return ','.join(map(repr, rounded.tolist()))
+
+
+def bm25_query(query_text):
+    return f'title:{query_text} OR abstract:{query_text} OR text:{query_text} OR author:{query_text}'
+
+
+def knn_query(vector, top_k, precision=VECTOR_PRECISION):
+    return f'{{!knn f=vector topK={top_k}}}[{format_vector(vector, precision)}]'
+
+
+def needs_vector(mode):
+    return mode in (SEMANTIC_MODE, HYBRID_MODE, SEMANTIC_LOCAL_MODE, FUSION_MODE)
+
+
+def build_params(mode, query_text, vector=None, rows=RESULT_ROWS, precision=VECTOR_PRECISION,
+                 start=0, fields=RESULT_FIELDS, top_k=None):
+    params = {
+        'fl': fields,
+        'rows': rows,
+        'wt': 'json'
+    }
+    if start:
+        params['start'] = start
+    if mode == BM25_MODE:
+        params['q'] = bm25_query(query_text)
+    elif mode == SEMANTIC_MODE:
+        # topK is the depth of the ranking being read, so a page needs topK >= start + rows
+        params['q'] = knn_query(vector, top_k or rows, precision)
+    elif mode == HYBRID_MODE:
+        params['q'] = bm25_query(query_text)
+        params['rq'] = f'{{!rerank reRankQuery=$rvec reRankDocs={RERANK_DOCS} reRankWeight={RERANK_WEIGHT}}}'
+        params['rvec'] = knn_query(vector, RERANK_DOCS, precision)
+    else:
+        raise ValueError(f"Unknown paradigm: {mode}")
+    return params
@@ -0,0 +1,93 @@
+import time
+import threading
+from collections import OrderedDict
+
+
+QUERY_CACHE_SIZE = 1024
+QUERY_CACHE_TTL = None
+
+
+class QueryVectorCache:
+    # Bounded LRU cache in front of model.encode. Concurrent requests for the same query
+    # wait for the first one instead of encoding it again.
+
+    def __init__(self, model, max_size=QUERY_CACHE_SIZE, ttl=QUERY_CACHE_TTL):
+        self.model = model
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def _lookup(self, text):
+        entry = self._entries.get(text)
+        if entry is None:
+            return None
+        vector, created = entry
+        if self.ttl is not None and time.monotonic() - created > self.ttl:
+            del self._entries[text]
+            return None
+        self._entries.move_to_end(text)
+        return vector
+
+    def _store(self, text, vector):
+        vector.setflags(write=False)
+        self._entries[text] = (vector, time.monotonic())
+        self._entries.move_to_end(text)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def encode(self, text):
+        while True:
+            with self._lock:
+                vector = self._lookup(text)
+                if vector is not None:
+                    self.hits += 1
+                    return vector
+                pending = self._pending.get(text)
+                if pending is None:
+                    self.misses += 1
+                    pending = self._pending[text] = threading.Event()
+                    break
+            pending.wait()
+
+        try:
+            vector = self.model.encode(text)
+            with self._lock:
+                self._store(text, vector)
+            return vector
+        finally:
+            with self._lock:
+                del self._pending[text]
+            pending.set()
+
+    def encode_many(self, texts, batch_size=64):
+        results = {}
+        with self._lock:
+            for text in texts:
+                vector = self._lookup(text)
+                if vector is not None:
+                    self.hits += 1
+                    results[text] = vector
+            missing = list(dict.fromkeys(text for text in texts if text not in results))
+            self.misses += len(missing)
+
+        if missing:
+            vectors = self.model.encode(missing, batch_size=batch_size)
+            with self._lock:
+                for text, vector in zip(missing, vectors):
+                    self._store(text, vector)
+                    results[text] = vector
+        return [results[text] for text in texts]
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
@@ -0,0 +1,42 @@
+import time
+import random
+
+
+INITIAL_DELAY = 0.1
+MAX_DELAY = 2.0
+PROVISION_TIMEOUT = 120
+
+
+def deadline_after(seconds=PROVISION_TIMEOUT):
+    return time.monotonic() + seconds
+
+
+def wait_until(check, deadline, description, initial_delay=INITIAL_DELAY, max_delay=MAX_DELAY, failed=None, log=print):
+    # Polls `check` until it returns something truthy, which is then returned. Delays start
+    # small and double up to max_delay, each one jittered so several waiters do not poll in
+    # step; every wait in a provisioning run shares one deadline instead of its own retry count.
+    # `failed` can return a reason to stop early, such as the process being waited on exiting.
+    delay = initial_delay
+    attempts = 0
+    last_error = None
+    start = time.monotonic()
+    while True:
+        attempts += 1
+        try:
+            result = check()
+        except Exception as e:
+            result, last_error = None, e
+        if result:
+            log(f"[INFO] {description} after {time.monotonic() - start:.2f}s ({attempts} checks).")
+            return result
+        reason = failed() if failed is not None else None
+        if reason:
+            log(f"[ERROR] Stopped waiting until: {description}: {reason}")
+            return None
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            reason = f": {last_error}" if last_error is not None else ""
+            log(f"[ERROR] Timed out after {time.monotonic() - start:.1f}s waiting until: {description}{reason}")
+            return None
+        time.sleep(min(remaining, random.uniform(delay / 2, delay)))
+        delay = min(max_delay, delay * 2)
@@ -0,0 +1,150 @@
+import os
+import time
+import uuid
+import threading
+from pathlib import Path
+from collections import OrderedDict
+
+
+RESULT_CACHE_SIZE = 512
+GENERATION_DIR = Path(__file__).resolve().parent / "cache"
+
+
+def generation_path(collection_name, generation_dir=GENERATION_DIR):
+    return Path(generation_dir) / f"{collection_name}.generation"
+
+
+def bump_generation(collection_name, generation_dir=GENERATION_DIR):
+    # Written by collection_updates after each commit; every result cache reading this
+    # collection's token drops its entries on the next lookup
+    path = generation_path(collection_name, generation_dir)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    token = uuid.uuid4().hex
+    temp_path = path.with_name(path.name + ".tmp")
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        f.write(token)
+    os.replace(temp_path, path)
+    return token
+
+
+def read_generation(collection_name, generation_dir=GENERATION_DIR):
+    try:
+        return generation_path(collection_name, generation_dir).read_text(encoding='utf-8').strip()
+    except FileNotFoundError:
+        return None
+
+
+def normalize_query(query_text):
+    # Solr's text analysis and the (uncased) embedding model both ignore case and spacing
+    return " ".join(query_text.split()).casefold()
+
+
+class SearchResultCache:
+    # Bounded LRU cache of result lists keyed by (paradigm, normalised query, parameters).
+    # Like QueryVectorCache, a second request for a search already in flight waits for it.
+    # The collection generation token is checked at most every `check_interval` seconds, and
+    # `on_invalidate` callbacks run when it changes so other per-collection state can be dropped.
+
+    def __init__(self, collection_name, max_size=RESULT_CACHE_SIZE, check_interval=1.0, generation_dir=GENERATION_DIR,
+                 on_invalidate=()):
+        self.collection_name = collection_name
+        self.max_size = max_size
+        self.check_interval = check_interval
+        self.generation_dir = generation_dir
+        self.generation = read_generation(collection_name, generation_dir)
+        self.on_invalidate = list(on_invalidate)
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.saved_seconds = 0.0
+        self._checked = time.monotonic()
+        self._entries = OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def _check_generation(self):
+        # Called with the lock held; returns True when the generation changed, and the caller
+        # then runs the on_invalidate callbacks after releasing the lock
+        now = time.monotonic()
+        if now - self._checked < self.check_interval:
+            return False
+        self._checked = now
+        generation = read_generation(self.collection_name, self.generation_dir)
+        if generation == self.generation:
+            return False
+        self.generation = generation
+        if self._entries:
+            self.invalidations += 1
+        self._entries.clear()
+        return True
+
+    def _run_invalidate_callbacks(self):
+        # Outside the lock: resetting an index waits for any build in progress, which must not
+        # hold up cache lookups from other threads
+        for callback in list(self.on_invalidate):
+            try:
+                callback()
+            except Exception as e:
+                print(f"[ERROR] Cache invalidation callback failed: {e}")
+
+    def check_generation(self):
+        # For callers that use per-collection state without going through get_or_search
+        with self._lock:
+            invalidated = self._check_generation()
+        if invalidated:
+            self._run_invalidate_callbacks()
+
+    def get_or_search(self, key, search):
+        while True:
+            with self._lock:
+                invalidated = self._check_generation()
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    docs, latency = entry
+                    self.hits += 1
+                    self.saved_seconds += latency
+                    return list(docs)
+                pending = self._pending.get(key)
+                owner = pending is None
+                if owner:
+                    self.misses += 1
+                    pending = self._pending[key] = threading.Event()
+                    generation = self.generation
+            if invalidated:
+                self._run_invalidate_callbacks()
+            if owner:
+                break
+            pending.wait()
+
+        try:
+            start = time.perf_counter()
+            docs = search()
+            latency = time.perf_counter() - start
+            with self._lock:
+                # Results fetched while a reindex was committed are not kept
+                if generation == self.generation and self.max_size > 0:
+                    self._entries[key] = (list(docs), latency)
+                    while len(self._entries) > self.max_size:
+                        self._entries.popitem(last=False)
+            return docs
+        finally:
+            with self._lock:
+                del self._pending[key]
+            pending.set()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "saved_ms": self.saved_seconds * 1000.0,
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,140 @@
+from collections import OrderedDict
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QObject, QRunnable, QThreadPool, pyqtSignal
+from query_builders import PAGE_SIZE
+
+
+COLUMNS = ['ID', 'Title', 'Score']
+MAX_CACHED_PAGES = 10
+
+
+def as_text(value):
+    return ' '.join(value) if isinstance(value, list) else str(value)
+
+
+class PageSignals(QObject):
+    page_ready = pyqtSignal(int, int, list)
+    page_failed = pyqtSignal(int, int, str)
+
+
+class PageLoader(QRunnable):
+    def __init__(self, generation, page, fetch_page):
+        super().__init__()
+        self.generation = generation
+        self.page = page
+        self.fetch_page = fetch_page
+        self.signals = PageSignals()
+
+    def run(self):
+        try:
+            docs, _ = self.fetch_page(self.page * PAGE_SIZE, PAGE_SIZE)
+            self.signals.page_ready.emit(self.generation, self.page, docs)
+        except Exception as e:
+            self.signals.page_failed.emit(self.generation, self.page, str(e))
+
+
+class ResultsTableModel(QAbstractTableModel):
+    # Reports every hit as a row but only holds the last MAX_CACHED_PAGES pages; the view asks
+    # for the rows on screen, and missing pages are fetched on a pool thread, so memory and
+    # render time stay the same however many hits the search has.
+
+    error = pyqtSignal(str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.total = 0
+        self.fetch_page = None
+        self.generation = 0
+        self.pages = OrderedDict()
+        self.loading = set()
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(2)
+
+    def reset_results(self, first_page, total, fetch_page):
+        self.beginResetModel()
+        self.generation += 1
+        self.total = total
+        self.fetch_page = fetch_page
+        self.pages = OrderedDict([(0, first_page)])
+        self.loading = set()
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.total
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        return COLUMNS[section] if orientation == Qt.Horizontal else str(section + 1)
+
+    def doc_at(self, row):
+        page, offset = divmod(row, PAGE_SIZE)
+        docs = self.pages.get(page)
+        if docs is None:
+            self.request_page(page)
+            return None
+        self.pages.move_to_end(page)
+        return docs[offset] if offset < len(docs) else None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.ToolTipRole):
+            return None
+        doc = self.doc_at(index.row())
+        if doc is None:
+            return "Loading..." if index.column() == 1 else ""
+        if index.column() == 0:
+            return as_text(doc.get('id', 'N/A'))
+        if index.column() == 1:
+            return as_text(doc.get('title', 'No Title'))
+        score = doc.get('score', 0)
+        return f"{score:.3f}" if isinstance(score, (int, float)) else str(score)
+
+    def request_page(self, page):
+        if page in self.loading or self.fetch_page is None:
+            return
+        self.loading.add(page)
+        loader = PageLoader(self.generation, page, self.fetch_page)
+        loader.signals.page_ready.connect(self.store_page)
+        loader.signals.page_failed.connect(self.page_failed)
+        self.pool.start(loader)
+
+    def store_page(self, generation, page, docs):
+        if generation != self.generation:
+            return
+        self.loading.discard(page)
+        self.pages[page] = docs
+        while len(self.pages) > MAX_CACHED_PAGES:
+            self.pages.popitem(last=False)
+        first = page * PAGE_SIZE
+        last = min(first + PAGE_SIZE, self.total) - 1
+        if last >= first:
+            self.dataChanged.emit(self.index(first, 0), self.index(last, len(COLUMNS) - 1))
+
+    def page_failed(self, generation, page, message):
+        if generation != self.generation:
+            return
+        self.loading.discard(page)
+        self.error.emit(f"Could not load results {page * PAGE_SIZE + 1}-{(page + 1) * PAGE_SIZE}: {message}")
+
+
+class AbstractSignals(QObject):
+    abstract_ready = pyqtSignal(str)
+
+
+class AbstractLoader(QRunnable):
+    # Abstracts are not part of the paged results; they are fetched when a row is opened
+    def __init__(self, doc, fetch_abstract):
+        super().__init__()
+        self.doc = doc
+        self.fetch_abstract = fetch_abstract
+        self.signals = AbstractSignals()
+
+    def run(self):
+        try:
+            abstract = self.fetch_abstract(as_text(self.doc.get('id', '')))
+            self.doc['abstract'] = abstract
+        except Exception as e:
+            abstract = f"Could not load the abstract: {e}"
+        self.signals.abstract_ready.emit(as_text(abstract) or 'No abstract available.')
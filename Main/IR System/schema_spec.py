@@ -0,0 +1,43 @@
+VECTOR_DIMENSION = 384
+
+# The schema the collection needs on top of the _default configset. Field types and fields
+# missing from the live schema are added and ones whose settings differ are replaced.
+SCHEMA_SPEC = {
+    "field_types": [
+        {"name": "knn_vector", "class": "solr.DenseVectorField", "vectorDimension": VECTOR_DIMENSION,
+         "similarityFunction": "cosine"},
+    ],
+    "fields": [
+        {"name": "title", "type": "text_general", "stored": True},
+        {"name": "author", "type": "text_general", "stored": True},
+        {"name": "text", "type": "text_general", "stored": True},
+        {"name": "abstract", "type": "text_general", "stored": True},
+        {"name": "vector", "type": "knn_vector", "indexed": True, "stored": False},
+    ],
+}
+
+
+def _same_value(current, wanted):
+    # The schema API returns some attributes as strings ("384", "true")
+    return str(current).lower() == str(wanted).lower()
+
+
+def _differs(current, wanted):
+    return any(not _same_value(current.get(key), value) for key, value in wanted.items())
+
+
+def schema_commands(schema, spec=SCHEMA_SPEC):
+    # Compares the spec with a GET /schema response and returns a single multi-command body.
+    # Field types come first so new fields can refer to them in the same request.
+    field_types = {field_type["name"]: field_type for field_type in schema.get("fieldTypes", [])}
+    fields = {field["name"]: field for field in schema.get("fields", [])}
+    commands = {}
+    for kind, existing, add, replace in (("field_types", field_types, "add-field-type", "replace-field-type"),
+                                         ("fields", fields, "add-field", "replace-field")):
+        for wanted in spec.get(kind, []):
+            current = existing.get(wanted["name"])
+            if current is None:
+                commands.setdefault(add, []).append(wanted)
+            elif _differs(current, wanted):
+                commands.setdefault(replace, []).append(wanted)
+    return commands
@@ -0,0 +1,115 @@
+import functools
+import numpy as np
+import solr_client
+import instrumentation
+import fusion
+from query_builders import (SEMANTIC_MODE, SEMANTIC_LOCAL_MODE, BM25_LOCAL_MODE, FUSION_MODE, RESULT_ROWS, PAGE_FIELDS,
+                            PAGE_DEPTH, build_params, needs_vector)
+from result_cache import SearchResultCache, normalize_query
+from vector_search import get_vector_index, reset_vector_index
+from bm25_index import get_bm25_index, reset_bm25_index
+
+
+# Paradigms answered in-process that can score a whole matrix of queries in one call
+BATCH_MODES = {SEMANTIC_LOCAL_MODE}
+# Paradigms ranked in-process, paged by slicing one ranking (see page_depth)
+SLICED_MODES = {SEMANTIC_LOCAL_MODE, BM25_LOCAL_MODE, FUSION_MODE}
+
+# Shared by the search tab and the per-paradigm evaluations, which often ask for the same results.
+# A new collection generation also drops the in-process indexes so they are rebuilt from the new corpus.
+RESULT_CACHE = SearchResultCache(solr_client.COLLECTION_NAME, on_invalidate=(reset_vector_index, reset_bm25_index))
+
+
+def cache_key(mode, query_text, rows, model=None, kind="results"):
+    # Result lists and (page, total) pairs are stored under separate kinds, so search() can
+    # never be handed a page entry
+    key = (kind, mode, normalize_query(query_text), rows)
+    if needs_vector(mode):
+        key += (getattr(model, "name", None),)
+    if mode == FUSION_MODE:
+        key += (tuple(sorted(fusion.current_settings().items())),)
+    return key
+
+
+def search(mode, query_text, vector=None, rows=RESULT_ROWS, model=None, use_cache=True):
+    with instrumentation.paradigm(mode):
+        if use_cache:
+            return RESULT_CACHE.get_or_search(cache_key(mode, query_text, rows, model),
+                                              lambda: _search(mode, query_text, vector, rows, model, use_cache))
+        return _search(mode, query_text, vector, rows, model, use_cache)
+
+
+def _search(mode, query_text, vector=None, rows=RESULT_ROWS, model=None, use_cache=True):
+    if mode in (SEMANTIC_LOCAL_MODE, BM25_LOCAL_MODE):
+        # Searches that skip the result cache still drop indexes built before a reindex
+        RESULT_CACHE.check_generation()
+    if mode == SEMANTIC_LOCAL_MODE:
+        index = get_vector_index(model)
+        with instrumentation.span("search"):
+            return index.search(vector, rows)
+    if mode == BM25_LOCAL_MODE:
+        index = get_bm25_index()
+        with instrumentation.span("search"):
+            return index.search(query_text, rows)
+    if mode == FUSION_MODE:
+        # Fusion sources go through the cache too, so they are shared with the plain paradigms
+        return fusion.fusion_search(functools.partial(search, use_cache=use_cache), query_text, vector, rows, model)
+    return solr_client.select(build_params(mode, query_text, vector, rows=rows))
+
+
+def search_many(mode, query_texts, vectors, rows=RESULT_ROWS, model=None, use_cache=True):
+    if mode == SEMANTIC_LOCAL_MODE:
+        RESULT_CACHE.check_generation()
+        return get_vector_index(model).search_batch(np.stack(vectors), rows)
+    return [search(mode, text, vector, rows, model, use_cache) for text, vector in zip(query_texts, vectors)]
+
+
+def search_page(mode, query_text, vector=None, start=0, rows=RESULT_ROWS, model=None, use_cache=True):
+    # Returns one page of results and the number of hits that can be paged through
+    if use_cache:
+        with instrumentation.paradigm(mode):
+            return RESULT_CACHE.get_or_search(cache_key(mode, query_text, (start, rows), model, kind="page"),
+                                              lambda: _search_page(mode, query_text, vector, start, rows, model, use_cache))
+    return _search_page(mode, query_text, vector, start, rows, model, use_cache)
+
+
+def page_depth(mode):
+    # Fusion is ranked at its configured depth, as batch_evaluate does; asking it for PAGE_DEPTH
+    # would make each source fetch 1000 full documents and change the fused ranking
+    return fusion.current_settings()["depth"] if mode == FUSION_MODE else PAGE_DEPTH
+
+
+def _search_page(mode, query_text, vector, start, rows, model, use_cache):
+    if mode in SLICED_MODES:
+        docs = search(mode, query_text, vector, page_depth(mode), model, use_cache)
+        return docs[start:start + rows], len(docs)
+    # A knn search only ranks as deep as the pages asked for so far, rather than PAGE_DEPTH up front
+    top_k = min(start + rows, PAGE_DEPTH) if mode == SEMANTIC_MODE else None
+    with instrumentation.paradigm(mode):
+        response = solr_client.query(build_params(mode, query_text, vector, rows=rows, start=start,
+                                                  fields=PAGE_FIELDS, top_k=top_k))
+        total = response['numFound']
+        if mode == SEMANTIC_MODE and total >= top_k:
+            # numFound of a knn query is capped at topK, so the pageable depth comes from the collection size
+            total = min(collection_size(), PAGE_DEPTH)
+    return response['docs'], total
+
+
+def collection_size():
+    return solr_client.query({'q': '*:*', 'rows': 0, 'wt': 'json'})['numFound']
+
+
+def fetch_abstract(doc_id):
+    docs = solr_client.select({'q': f'id:"{doc_id}"', 'fl': 'abstract', 'rows': 1})
+    return docs[0].get('abstract', '') if docs else ''
+
+
+def iter_results(mode, query_text, vector=None, depth=PAGE_DEPTH, page_size=solr_client.CURSOR_PAGE_SIZE, model=None):
+    # Yields up to `depth` results in rank order. Solr paradigms stream them with cursorMark;
+    # the in-process ones already hold every document, so their ranking is read directly.
+    if mode in SLICED_MODES:
+        yield from search(mode, query_text, vector, depth, model, use_cache=False)
+        return
+    with instrumentation.paradigm(mode):
+        params = build_params(mode, query_text, vector, rows=page_size, fields='id,score', top_k=depth)
+        yield from solr_client.iter_select(params, page_size=page_size, max_docs=depth)
@@ -0,0 +1,132 @@
+import json
+import time
+import argparse
+import datetime
+from pathlib import Path
+import solr_client
+import batch_evaluate
+import model_loader
+import collection_updates
+from benchmark import benchmark_latency
+from corpus import CORPUS_PATH
+from encoders import ENCODER_BACKENDS
+from shard_routing import COMPOSITE_ID_ROUTER, ROUTERS, cluster_status
+from query_builders import BM25_MODE, SEMANTIC_MODE, HYBRID_MODE
+
+
+DEFAULT_SHARDS = (1, 2, 4)
+DEFAULT_CLIENTS = (1, 8)
+DEFAULT_PARADIGMS = [BM25_MODE, SEMANTIC_MODE, HYBRID_MODE]
+DEFAULT_OUTPUT = Path(__file__).resolve().parent / "results" / "shard_scaling.json"
+COLLECTION_PREFIX = "benchmark-shards"
+
+
+def use_collection(name):
+    # The ingestion and search paths read these module settings, as in benchmark.benchmark_ingestion
+    collection_updates.COLLECTION_NAME = name
+    solr_client.SELECT_URL = f"{solr_client.SOLR_URL}/{name}/select"
+
+
+def live_nodes():
+    try:
+        return cluster_status(None).get("live_nodes", [])
+    except Exception:
+        return []
+
+
+def build_collection(name, shards, replicas, router, router_field, xml_path, upload_threads):
+    use_collection(name)
+    if collection_updates.check_collection_exists():
+        collection_updates.delete_collection(name)
+    collection_updates.create_collection(shards, replicas, router, router_field)
+    schema = collection_updates.wait_for_collection_ready(name) and collection_updates.wait_for_schema_ready()
+    if not schema:
+        raise RuntimeError(f"Collection '{name}' did not become ready")
+    collection_updates.update_schema(schema)
+
+    start = time.perf_counter()
+    collection_updates.upload_documents(xml_path, use_cache=True, upload_threads=upload_threads)
+    elapsed = time.perf_counter() - start
+    found = solr_client.query({"q": "*:*", "rows": 0})["numFound"]
+    return {"documents": found, "seconds": elapsed, "docs_per_sec": found / elapsed if elapsed > 0 else 0.0}
+
+
+def run_scaling(args):
+    nodes = live_nodes()
+    print(f"[INFO] {len(nodes)} live Solr nodes: {', '.join(nodes) or 'unknown'}")
+    if len(nodes) < 2:
+        print("[INFO] With a single node, shards share one JVM and scaling is limited to its cores.")
+
+    model = model_loader.get_model()
+    queries = batch_evaluate.load_query_texts(limit=args.limit)
+    encoded = model.encode([text for _, text in queries], batch_size=64)
+    vectors = {qid: vector for (qid, _), vector in zip(queries, encoded)}
+
+    results = {
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "settings": {"nodes": nodes, "replicas": args.replicas, "router": args.router, "router_field": args.router_field,
+                     "upload_threads": args.upload_threads, "clients": args.clients, "queries": len(queries)},
+        "layouts": {},
+    }
+    original_collection, original_select_url = collection_updates.COLLECTION_NAME, solr_client.SELECT_URL
+    try:
+        for shards in args.shards:
+            name = f"{COLLECTION_PREFIX}-{shards}"
+            print(f"[INFO] === {shards} shards x {args.replicas} replicas ===")
+            ingest = build_collection(name, shards, args.replicas, args.router, args.router_field,
+                                      args.xml, args.upload_threads)
+            print(f"[INFO] Indexed {ingest['documents']} documents at {ingest['docs_per_sec']:.1f} docs/sec")
+            latency, _ = benchmark_latency(model, queries, vectors, args.paradigms, sorted(set(args.clients)), args.rows)
+            results["layouts"][f"shards={shards}"] = {"shards": shards, "ingest": ingest, "latency": latency}
+            if not args.keep:
+                collection_updates.delete_collection(name)
+    finally:
+        collection_updates.COLLECTION_NAME, solr_client.SELECT_URL = original_collection, original_select_url
+    return results
+
+
+def print_scaling(results):
+    layouts = list(results["layouts"].values())
+    if not layouts:
+        return
+    base = layouts[0]
+    print(f"[INFO] {'layout':<12}{'index docs/s':>14}{'speedup':>9}" + "".join(f"{mode[:22]:>26}" for mode in base["latency"]))
+    for layout in layouts:
+        speedup = layout["ingest"]["docs_per_sec"] / base["ingest"]["docs_per_sec"] if base["ingest"]["docs_per_sec"] else 0.0
+        cells = []
+        for mode, by_clients in layout["latency"].items():
+            # Query throughput at the highest client count, relative to the first layout
+            clients = list(by_clients)[-1]
+            qps, base_qps = by_clients[clients]["qps"], base["latency"][mode][clients]["qps"]
+            cells.append(f"{qps:>10.1f} qps ({qps / base_qps if base_qps else 0.0:.2f}x)".rjust(26))
+        print(f"[INFO] {'shards=' + str(layout['shards']):<12}{layout['ingest']['docs_per_sec']:>14.1f}{speedup:>8.2f}x" + "".join(cells))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Measure index and query throughput as a SolrCloud collection gains shards.")
+    parser.add_argument("--shards", nargs="+", type=int, default=list(DEFAULT_SHARDS), help="Shard counts to compare")
+    parser.add_argument("--replicas", type=int, default=collection_updates.REPLICATION_FACTOR, help="Replicas per shard")
+    parser.add_argument("--router", choices=ROUTERS, default=COMPOSITE_ID_ROUTER, help="Document router")
+    parser.add_argument("--router-field", default=None, help="Field the router uses instead of the document id")
+    parser.add_argument("--upload-threads", type=int, default=collection_updates.UPLOAD_THREADS, help="Parallel update requests")
+    parser.add_argument("--paradigms", nargs="+", default=DEFAULT_PARADIGMS, choices=DEFAULT_PARADIGMS,
+                        help="Solr paradigms to time (the in-process ones do not depend on the shard layout)")
+    parser.add_argument("--clients", nargs="+", type=int, default=list(DEFAULT_CLIENTS), help="Concurrent client counts")
+    parser.add_argument("--rows", type=int, default=10, help="Results requested per search")
+    parser.add_argument("--limit", type=int, default=None, help="Only use the first N queries")
+    parser.add_argument("--encoder", choices=ENCODER_BACKENDS, default=model_loader.DEFAULT_BACKEND, help="Encoder backend")
+    parser.add_argument("--xml", default=str(CORPUS_PATH), help="Collection file to index")
+    parser.add_argument("--keep", action="store_true", help="Keep the benchmark collections afterwards")
+    parser.add_argument("--output", default=str(DEFAULT_OUTPUT), help="Where the JSON results are written")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    model_loader.configure(backend=args.encoder)
+    scaling_results = run_scaling(args)
+    print_scaling(scaling_results)
+    Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(scaling_results, f, indent=2)
+    print(f"[INFO] Results written to {args.output}")
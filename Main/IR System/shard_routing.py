@@ -0,0 +1,137 @@
+import itertools
+import solr_client
+
+
+COMPOSITE_ID_ROUTER = "compositeId"
+IMPLICIT_ROUTER = "implicit"
+ROUTERS = (COMPOSITE_ID_ROUTER, IMPLICIT_ROUTER)
+
+
+def murmurhash3_x86_32(data, seed=0):
+    # The hash Solr's compositeId router applies to the UTF-8 bytes of the route key
+    c1, c2 = 0xcc9e2d51, 0x1b873593
+    length = len(data)
+    h = seed & 0xffffffff
+    rounded_end = length & ~3
+    for i in range(0, rounded_end, 4):
+        k = int.from_bytes(data[i:i + 4], 'little')
+        k = (k * c1) & 0xffffffff
+        k = ((k << 15) | (k >> 17)) & 0xffffffff
+        k = (k * c2) & 0xffffffff
+        h ^= k
+        h = ((h << 13) | (h >> 19)) & 0xffffffff
+        h = (h * 5 + 0xe6546b64) & 0xffffffff
+
+    k = 0
+    tail = length & 3
+    if tail == 3:
+        k ^= data[rounded_end + 2] << 16
+    if tail >= 2:
+        k ^= data[rounded_end + 1] << 8
+    if tail >= 1:
+        k ^= data[rounded_end]
+        k = (k * c1) & 0xffffffff
+        k = ((k << 15) | (k >> 17)) & 0xffffffff
+        k = (k * c2) & 0xffffffff
+        h ^= k
+
+    h ^= length
+    h ^= h >> 16
+    h = (h * 0x85ebca6b) & 0xffffffff
+    h ^= h >> 13
+    h = (h * 0xc2b2ae35) & 0xffffffff
+    h ^= h >> 16
+    return h - 0x100000000 if h & 0x80000000 else h
+
+
+def composite_id_hash(route_key):
+    # "tenant!doc" keeps the top 16 bits from the prefix so related documents share a shard
+    if "!" in route_key:
+        prefix, _, rest = route_key.partition("!")
+        high = murmurhash3_x86_32(prefix.encode('utf-8')) & 0xffff0000
+        low = murmurhash3_x86_32(rest.encode('utf-8')) & 0x0000ffff
+        h = high | low
+        return h - 0x100000000 if h & 0x80000000 else h
+    return murmurhash3_x86_32(route_key.encode('utf-8'))
+
+
+def parse_range(text):
+    low, high = (int(part, 16) for part in text.split("-"))
+    return tuple(value - 0x100000000 if value & 0x80000000 else value for value in (low, high))
+
+
+def cluster_status(collection_name, solr_url=None):
+    request = solr_client.get(f"{solr_url or solr_client.SOLR_URL}/admin/collections",
+                              params={"action": "CLUSTERSTATUS", "collection": collection_name}, retry=False)
+    request.raise_for_status()
+    return request.json().get("cluster", {})
+
+
+class ShardRouter:
+    # Groups documents by the shard that owns them and sends each group straight to that
+    # shard's leader, as SolrJ's cloud client does, so updates skip the forwarding hop.
+
+    def __init__(self, collection_name, router_name, router_field, shards):
+        self.collection_name = collection_name
+        self.router_name = router_name
+        self.router_field = router_field
+        self.shards = shards
+        self._next_shard = itertools.cycle([shard["name"] for shard in shards])
+
+    @classmethod
+    def from_cluster(cls, collection_name, solr_url=None):
+        # Returns None when the cluster state is unavailable (standalone Solr, stand-in server),
+        # in which case updates go to the collection URL and Solr routes them itself
+        try:
+            state = cluster_status(collection_name, solr_url).get("collections", {}).get(collection_name)
+        except Exception as e:
+            print(f"[INFO] Cluster state unavailable, updates will not be routed: {e}")
+            return None
+        if not state:
+            return None
+
+        router = state.get("router", {})
+        shards = []
+        for name, shard in sorted(state.get("shards", {}).items()):
+            if shard.get("state", "active") != "active":
+                continue
+            leader = next((replica for replica in shard.get("replicas", {}).values()
+                           if replica.get("leader") == "true"), None)
+            if leader is None:
+                return None
+            shards.append({
+                "name": name,
+                "range": parse_range(shard["range"]) if shard.get("range") else None,
+                "update_url": f"{leader['base_url']}/{leader['core']}/update",
+            })
+        if not shards:
+            return None
+        return cls(collection_name, router.get("name", COMPOSITE_ID_ROUTER), router.get("field"), shards)
+
+    def shard_for(self, doc):
+        route_key = str(doc.get(self.router_field or "id", ""))
+        if self.router_name == IMPLICIT_ROUTER:
+            # The implicit router stores a document in the shard named by its router field,
+            # or in the shard that receives it when there is none
+            if self.router_field and route_key:
+                return next((shard for shard in self.shards if shard["name"] == route_key), None)
+            name = next(self._next_shard)
+            return next(shard for shard in self.shards if shard["name"] == name)
+        h = composite_id_hash(route_key)
+        return next((shard for shard in self.shards if shard["range"] and shard["range"][0] <= h <= shard["range"][1]), None)
+
+    def route(self, docs):
+        groups = {}
+        if self.router_name == IMPLICIT_ROUTER and not self.router_field:
+            # Whole groups rotate between shards instead of single documents, keeping batches large
+            shard = self.shard_for({})
+            return {shard["update_url"]: list(docs)}
+        for doc in docs:
+            shard = self.shard_for(doc)
+            if shard is None:
+                raise ValueError(f"No shard of '{self.collection_name}' owns document {doc.get('id')}")
+            groups.setdefault(shard["update_url"], []).append(doc)
+        return groups
+
+    def describe(self):
+        return f"{len(self.shards)} shards ({self.router_name}" + (f" on '{self.router_field}')" if self.router_field else ")")
@@ -0,0 +1,153 @@
+import threading
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import instrumentation
+
+
+SOLR_URL = "http://localhost:8990/solr"
+COLLECTION_NAME = "research-papers"
+SELECT_URL = f"{SOLR_URL}/{COLLECTION_NAME}/select"
+CONNECT_TIMEOUT = 3.05
+READ_TIMEOUT = 30
+MAX_RETRIES = 3
+BACKOFF_FACTOR = 0.3
+POOL_SIZE = 16
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# Statuses Solr answers with before acting on a request, so even a non-idempotent one can be resent
+REFUSED_STATUSES = (429, 503)
+# Searches, and updates keyed by document id, give the same result however often they are sent
+IDEMPOTENT_POST_PATHS = ("/select", "/query", "/update")
+CURSOR_PAGE_SIZE = 200
+
+_settings = {
+    "connect_timeout": CONNECT_TIMEOUT,
+    "read_timeout": READ_TIMEOUT,
+    "retries": MAX_RETRIES,
+    "backoff_factor": BACKOFF_FACTOR,
+    "pool_size": POOL_SIZE,
+}
+_sessions = {}
+_lock = threading.Lock()
+
+
+def configure(**settings):
+    unknown = set(settings) - set(_settings)
+    if unknown:
+        raise ValueError(f"Unknown Solr client settings: {', '.join(sorted(unknown))}")
+    with _lock:
+        _settings.update(settings)
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+
+
+def _build_session(retries, statuses=RETRY_STATUSES, read_retries=None):
+    retry = Retry(
+        total=retries,
+        read=read_retries,
+        backoff_factor=_settings["backoff_factor"],
+        status_forcelist=statuses,
+        allowed_methods=frozenset(["GET", "POST"]),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=_settings["pool_size"], pool_maxsize=_settings["pool_size"], max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def get_session(retry=True, idempotent=True):
+    # Health probes use their own session without retries so polling loops keep their own pace.
+    # Non-idempotent requests (schema and collection-admin POSTs) are only resent when Solr
+    # refused them outright, never after a 5xx or a read timeout that may follow a partial apply.
+    key = (retry, idempotent) if retry else False
+    with _lock:
+        if key not in _sessions:
+            if not retry:
+                _sessions[key] = _build_session(0)
+            elif idempotent:
+                _sessions[key] = _build_session(_settings["retries"])
+            else:
+                _sessions[key] = _build_session(_settings["retries"], REFUSED_STATUSES, read_retries=0)
+        return _sessions[key]
+
+
+def idempotent_post(url):
+    return urlsplit(url).path.rstrip("/").endswith(IDEMPOTENT_POST_PATHS)
+
+
+def default_timeout():
+    return (_settings["connect_timeout"], _settings["read_timeout"])
+
+
+def get(url, params=None, timeout=None, retry=True, **kwargs):
+    return get_session(retry).get(url, params=params, timeout=timeout or default_timeout(), **kwargs)
+
+
+def post(url, data=None, json=None, timeout=None, retry=True, **kwargs):
+    return get_session(retry, idempotent_post(url)).post(url, data=data, json=json, timeout=timeout or default_timeout(), **kwargs)
+
+
+def query(params, url=None, timeout=None):
+    # Parameters go in a JSON request body so long vectors never end up in the URL.
+    # SELECT_URL is read at call time so the benchmark can point searches at a stand-in server.
+    with instrumentation.span("request"):
+        response = post(url or SELECT_URL, json={"params": params}, timeout=timeout)
+        response.raise_for_status()
+    with instrumentation.span("parse"):
+        return response.json()['response']
+
+
+def select(params, url=None, timeout=None):
+    return query(params, url, timeout)['docs']
+
+
+def query_cursor(params, cursor_mark, url=None, timeout=None):
+    with instrumentation.span("request"):
+        response = post(url or SELECT_URL, json={"params": {**params, "cursorMark": cursor_mark}}, timeout=timeout)
+        response.raise_for_status()
+    with instrumentation.span("parse"):
+        body = response.json()
+    return body['response']['docs'], body.get('nextCursorMark', cursor_mark)
+
+
+def iter_select(params, page_size=CURSOR_PAGE_SIZE, max_docs=None, url=None, timeout=None, prefetch=True):
+    # Streams a result set in pages using cursorMark, so only one page (plus the one being
+    # prefetched) is held at a time however deep the caller reads. The /export handler would
+    # avoid the ranking cost but cannot sort by score, so it is no use for ranked retrieval.
+    # Cursors need a sort ending on the unique key, and cannot be combined with start.
+    params = {key: value for key, value in params.items() if key != 'start'}
+    params['rows'] = page_size if max_docs is None else min(page_size, max_docs)
+    params.setdefault('sort', 'score desc,id asc')
+
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="solr-cursor") if prefetch else None
+    try:
+        cursor_mark, returned = '*', 0
+        pending = executor.submit(query_cursor, params, cursor_mark, url, timeout) if executor else None
+        while True:
+            docs, next_mark = pending.result() if pending else query_cursor(params, cursor_mark, url, timeout)
+            finished = not docs or next_mark == cursor_mark or (max_docs is not None and returned + len(docs) >= max_docs)
+            cursor_mark = next_mark
+            # The next page is requested before this one is handed to the caller
+            pending = executor.submit(query_cursor, params, cursor_mark, url, timeout) if executor and not finished else None
+            for doc in docs:
+                if max_docs is not None and returned >= max_docs:
+                    return
+                returned += 1
+                yield doc
+            if finished:
+                return
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+def close():
+    with _lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
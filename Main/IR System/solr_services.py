@@ -0,0 +1,254 @@
+import os
+import sys
+import time
+import signal
+import shutil
+import socket
+import argparse
+import threading
+import subprocess
+from pathlib import Path
+from urllib.parse import urlsplit
+import solr_client
+from readiness import deadline_after, wait_until
+
+
+if getattr(sys, 'frozen', False):
+    BASE_DIR = Path(sys._MEIPASS)
+else:
+    BASE_DIR = Path(__file__).resolve().parents[1]
+JAVA_DIR = BASE_DIR / "jdk-17"
+ZK_DIR = BASE_DIR / "zookeeper"
+SOLR_DIR = BASE_DIR / "solr-9.5.0"
+ZK_PORT = 2181
+SOLR_PORT = urlsplit(solr_client.SOLR_URL).port or 8983
+START_TIMEOUT = 90
+STOP_TIMEOUT = 30
+IS_WINDOWS = os.name == "nt"
+
+
+def find_java():
+    # The bundled JDK is a Windows build; elsewhere JAVA_HOME or the java on PATH is used
+    candidates = [JAVA_DIR / "bin" / ("java.exe" if IS_WINDOWS else "java")]
+    if os.environ.get("JAVA_HOME"):
+        candidates.append(Path(os.environ["JAVA_HOME"]) / "bin" / ("java.exe" if IS_WINDOWS else "java"))
+    for candidate in candidates:
+        if candidate.is_file() and os.access(candidate, os.X_OK):
+            return str(candidate)
+    java = shutil.which("java")
+    if java is None:
+        raise FileNotFoundError(f"No Java runtime found in {JAVA_DIR}, JAVA_HOME or PATH")
+    return java
+
+
+def zookeeper_port(zk_dir=ZK_DIR):
+    try:
+        with open(Path(zk_dir) / "conf" / "zoo.cfg", 'r', encoding='utf-8') as f:
+            for line in f:
+                key, _, value = line.partition("=")
+                if key.strip() == "clientPort" and value.strip().isdigit():
+                    return int(value.strip())
+    except OSError:
+        pass
+    return ZK_PORT
+
+
+def zookeeper_ok(port=ZK_PORT, host="localhost", timeout=2.0):
+    # ZooKeeper's "ruok" four-letter command answers "imok" once the server is serving
+    with socket.create_connection((host, port), timeout=timeout) as sock:
+        sock.sendall(b"ruok")
+        return sock.recv(16) == b"imok"
+
+
+def solr_ok(url=None):
+    response = solr_client.get(f"{url or solr_client.SOLR_URL}/admin/info/system", timeout=5, retry=False)
+    return response.status_code == 200
+
+
+class ServiceProcess:
+    # A child process whose combined output is read on a daemon thread and passed line by
+    # line to `on_output`, so a chatty JVM never blocks on a full pipe
+
+    def __init__(self, name, command, cwd, env=None, on_output=print, stop_command=None):
+        self.name = name
+        self.command = command
+        self.stop_command = stop_command
+        self.cwd = cwd
+        self.env = env
+        self.on_output = on_output
+        self.process = None
+        self.reader = None
+
+    def start(self):
+        # On POSIX a session of its own lets stop() signal the JVM as well as any launcher script
+        self.process = subprocess.Popen(self.command, cwd=self.cwd, env=self.env, stdin=subprocess.DEVNULL,
+                                        stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                        start_new_session=not IS_WINDOWS)
+        self.reader = threading.Thread(target=self._read_output, name=f"{self.name}-output", daemon=True)
+        self.reader.start()
+        return self
+
+    def _read_output(self):
+        for raw in iter(self.process.stdout.readline, b""):
+            self.on_output(f"[{self.name}] {raw.decode('utf-8', errors='replace').rstrip()}")
+        self.process.stdout.close()
+
+    def running(self):
+        return self.process is not None and self.process.poll() is None
+
+    def exit_reason(self):
+        if self.process is not None and self.process.poll() is not None:
+            return f"{self.name} exited with code {self.process.returncode}"
+        return None
+
+    def _run(self, command):
+        result = subprocess.run(command, cwd=self.cwd, env=self.env, stdin=subprocess.DEVNULL,
+                                stdout=subprocess.PIPE, stderr=subprocess.STDOUT, timeout=STOP_TIMEOUT)
+        for line in result.stdout.decode('utf-8', errors='replace').splitlines():
+            if line.strip():
+                self.on_output(f"[{self.name}] {line.rstrip()}")
+        return result.returncode == 0
+
+    def _kill_tree(self, force):
+        # On Windows the launched process may be a cmd.exe wrapper (solr.cmd), so the whole tree is
+        # ended; without /F taskkill only asks, and refuses outright for console programs like java
+        if IS_WINDOWS:
+            return self._run(["taskkill", "/T"] + (["/F"] if force else []) + ["/PID", str(self.process.pid)])
+        os.killpg(self.process.pid, signal.SIGKILL if force else signal.SIGTERM)
+        return True
+
+    def stop(self, timeout=STOP_TIMEOUT):
+        if not self.running():
+            return
+        # A service's own stop command first (solr stop), otherwise SIGTERM so the JVM runs its
+        # shutdown hooks; the process tree is killed only if that fails or hangs
+        try:
+            requested = self._run(self.stop_command) if self.stop_command else self._kill_tree(force=False)
+        except (OSError, subprocess.SubprocessError) as e:
+            self.on_output(f"[INFO] Could not ask {self.name} to stop: {e}")
+            requested = False
+        try:
+            self.process.wait(timeout if requested else 0)
+        except subprocess.TimeoutExpired:
+            if requested:
+                self.on_output(f"[INFO] {self.name} did not exit within {timeout}s, killing it.")
+            self._kill_tree(force=True)
+            self.process.wait()
+        if self.reader is not None:
+            self.reader.join(timeout=5)
+
+
+class ServiceManager:
+    # Starts ZooKeeper and SolrCloud from the bundled directories, moving on as soon as each
+    # one answers its health check instead of sleeping for a fixed time. Services that were
+    # already running are reused and left alone on stop().
+
+    def __init__(self, on_output=print, zk_dir=ZK_DIR, solr_dir=SOLR_DIR, solr_port=SOLR_PORT):
+        self.on_output = on_output
+        self.zk_dir = Path(zk_dir)
+        self.solr_dir = Path(solr_dir)
+        self.zk_port = zookeeper_port(zk_dir)
+        self.solr_port = solr_port
+        self.solr_url = f"http://localhost:{solr_port}/solr"
+        self.zookeeper = None
+        self.solr = None
+
+    def _healthy(self, check):
+        try:
+            return check()
+        except Exception:
+            return False
+
+    def _environment(self, java):
+        env = dict(os.environ)
+        env["JAVA_HOME"] = str(Path(java).resolve().parents[1])
+        env["PATH"] = str(Path(java).parent) + os.pathsep + env.get("PATH", "")
+        return env
+
+    def start_zookeeper(self, java, deadline):
+        if self._healthy(lambda: zookeeper_ok(self.zk_port)):
+            self.on_output(f"[INFO] ZooKeeper is already running on port {self.zk_port}.")
+            return True
+        # Launched with java directly rather than zkServer.sh/.cmd so it behaves the same on every
+        # platform; logging goes to the console appender so it can be streamed
+        classpath = os.pathsep.join([str(self.zk_dir / "lib" / "*"), str(self.zk_dir / "conf")])
+        command = [java, "-cp", classpath,
+                   "-Dzookeeper.log.dir=" + str(self.zk_dir / "logs"),
+                   "-Dzookeeper.root.logger=INFO,CONSOLE",
+                   "-Dzookeeper.4lw.commands.whitelist=ruok,stat",
+                   "-Dzookeeper.admin.enableServer=false",
+                   "org.apache.zookeeper.server.quorum.QuorumPeerMain", str(self.zk_dir / "conf" / "zoo.cfg")]
+        self.on_output("[INFO] Starting ZooKeeper...")
+        self.zookeeper = ServiceProcess("zookeeper", command, self.zk_dir, self._environment(java), self.on_output).start()
+        return bool(wait_until(lambda: zookeeper_ok(self.zk_port), deadline,
+                               f"ZooKeeper answered ruok on port {self.zk_port}", failed=self.zookeeper.exit_reason, log=self.on_output))
+
+    def start_solr(self, java, deadline):
+        if self._healthy(lambda: solr_ok(self.solr_url)):
+            self.on_output(f"[INFO] Solr is already running on port {self.solr_port}.")
+            return True
+        # -f keeps Solr in the foreground, so its output can be streamed and the process tracked
+        script = self.solr_dir / "bin" / ("solr.cmd" if IS_WINDOWS else "solr")
+        command = ([str(script)] if IS_WINDOWS else ["bash", str(script)]) + [
+            "start", "-c", "-f", "-z", f"localhost:{self.zk_port}", "-p", str(self.solr_port)]
+        self.on_output("[INFO] Starting SolrCloud...")
+        stop_command = ([str(script)] if IS_WINDOWS else ["bash", str(script)]) + ["stop", "-p", str(self.solr_port)]
+        self.solr = ServiceProcess("solr", command, self.solr_dir, self._environment(java), self.on_output,
+                                   stop_command).start()
+        return bool(wait_until(lambda: solr_ok(self.solr_url), deadline,
+                               f"Solr answered on port {self.solr_port}", failed=self.solr.exit_reason, log=self.on_output))
+
+    def start(self, timeout=START_TIMEOUT):
+        start = time.perf_counter()
+        deadline = deadline_after(timeout)
+        try:
+            java = find_java()
+            if not self.start_zookeeper(java, deadline) or not self.start_solr(java, deadline):
+                self.stop()
+                return False
+        except Exception as e:
+            self.on_output(f"[ERROR] Could not start the search services: {e}")
+            self.stop()
+            return False
+        self.on_output(f"[INFO] ZooKeeper and Solr ready in {time.perf_counter() - start:.1f}s.")
+        return True
+
+    def stop(self, timeout=STOP_TIMEOUT):
+        # Solr first, so it can deregister from ZooKeeper while ZooKeeper is still up
+        if self.solr is not None and self.solr.running():
+            self.on_output("[INFO] Stopping Solr...")
+            self.solr.stop(timeout)
+        if self.zookeeper is not None and self.zookeeper.running():
+            self.on_output("[INFO] Stopping ZooKeeper...")
+            self.zookeeper.stop(timeout)
+        self.solr = self.zookeeper = None
+
+    def status(self):
+        return {"zookeeper": self._healthy(lambda: zookeeper_ok(self.zk_port)),
+                "solr": self._healthy(lambda: solr_ok(self.solr_url))}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Start, check or stop the bundled ZooKeeper and SolrCloud.")
+    parser.add_argument("command", choices=["start", "status"], help="start runs both until Ctrl+C, then stops them")
+    parser.add_argument("--timeout", type=float, default=START_TIMEOUT, help="Seconds allowed for both services to start")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    manager = ServiceManager()
+    if args.command == "status":
+        for service, healthy in manager.status().items():
+            print(f"[INFO] {service}: {'online' if healthy else 'offline'}")
+        sys.exit(0)
+    if not manager.start(args.timeout):
+        sys.exit(1)
+    try:
+        while all(service is None or service.running() for service in (manager.zookeeper, manager.solr)):
+            time.sleep(1)
+        print("[ERROR] A service exited unexpectedly.")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        manager.stop()
@@ -0,0 +1,31 @@
+import json
+import time
+import datetime
+from pathlib import Path
+
+
+# Imported first by IR_Main so the clock starts before any heavy import
+PROCESS_START = time.perf_counter()
+DEFAULT_LOG_PATH = Path(__file__).resolve().parent / "results" / "startup_times.jsonl"
+
+_marks = {}
+
+
+def mark(name):
+    if name in _marks:
+        return _marks[name]
+    _marks[name] = time.perf_counter() - PROCESS_START
+    print(f"[INFO] Startup: {name} after {_marks[name]:.2f}s")
+    return _marks[name]
+
+
+def marks():
+    return dict(_marks)
+
+
+def save(path=DEFAULT_LOG_PATH):
+    # One JSON line per application start, so startup time can be tracked across changes
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps({"started": datetime.datetime.now().isoformat(timespec="seconds"), **_marks}) + "\n")
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The application modules sit flat in "IR System" and import each other by name
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
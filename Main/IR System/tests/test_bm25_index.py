@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+from bm25_index import BM25Index
+from evaluation import load_queries
+
+
+@pytest.fixture(scope="module")
+def cranfield():
+    return BM25Index.from_corpus()
+
+
+def assert_same_ranking(pruned, exhaustive):
+    # Accumulation order differs, so scores match to float32 rounding and equal scores may swap
+    assert len(pruned) == len(exhaustive)
+    pruned_scores = [doc["score"] for doc in pruned]
+    assert np.allclose(pruned_scores, [doc["score"] for doc in exhaustive], rtol=1e-5)
+    cutoff = min(pruned_scores, default=0.0) * (1 + 1e-5)
+    assert ({doc["id"] for doc in pruned if doc["score"] > cutoff} ==
+            {doc["id"] for doc in exhaustive if doc["score"] > cutoff})
+
+
+@pytest.mark.parametrize("top_k", [1, 10, 50, 1000])
+def test_maxscore_matches_exhaustive_on_cranfield(cranfield, top_k):
+    for query_text in load_queries().values():
+        assert_same_ranking(cranfield.search(query_text, top_k), cranfield.search_exhaustive(query_text, top_k))
+
+
+def test_small_corpus():
+    documents = [{"id": str(i), "title": title, "author": "", "text": text, "abstract": ""}
+                 for i, (title, text) in enumerate([("wing flutter", "flutter of a swept wing at high speed"),
+                                                    ("boundary layer", "the laminar boundary layer on a flat plate"),
+                                                    ("heat transfer", "heat transfer in the boundary layer"),
+                                                    ("the the the", "the of a at in")])]
+    index = BM25Index(documents)
+    assert index.search("", 10) == []
+    assert index.search("unknownterm", 10) == []
+    assert index.search("boundary layer", 0) == []
+    results = index.search("boundary layer heat", 2)
+    assert [doc["id"] for doc in results] == ["2", "1"]
+    assert_same_ranking(results, index.search_exhaustive("boundary layer heat", 2))
+    assert_same_ranking(index.search("the wing", 10), index.search_exhaustive("the wing", 10))
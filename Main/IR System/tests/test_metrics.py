@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+from metrics import compute_metrics, streaming_metrics
+
+
+def test_hand_computed_values():
+    # Relevant docs {1, 3, 5}, ranking 3, 2, 1, 4 (ids given as padded strings)
+    results = compute_metrics([[" 3", "002", "1", "4"]], [{"1", "3", "5"}], k_values=(1, 2, 4))
+    expected = {
+        "P@1": 1.0, "P@2": 0.5, "P@4": 0.5,
+        "R@1": 1 / 3, "R@4": 2 / 3,
+        "AP": (1 / 1 + 2 / 3) / 3,
+        "MRR": 1.0,
+        "R-Prec": 2 / 3,
+        "nDCG@2": 1.0 / (1.0 + 1 / np.log2(3)),
+        "nDCG@4": (1.0 + 1 / np.log2(4)) / (1.0 + 1 / np.log2(3) + 1 / np.log2(4)),
+    }
+    for name, value in expected.items():
+        assert results[name][0] == pytest.approx(value), name
+
+
+def test_duplicates_empty_judgements_and_short_rankings():
+    # Duplicates count once, a query with no relevant documents scores zero, short rankings pad with misses
+    results = compute_metrics([["7", "7", "9"], ["1"], []], [{"9"}, set(), {"2"}], k_values=(3,))
+    assert np.allclose(results["P@3"], [1 / 3, 0.0, 0.0])
+    assert np.allclose(results["AP"], [1 / 3, 0.0, 0.0])
+    assert np.allclose(results["MRR"], [1 / 3, 0.0, 0.0])
+    assert np.allclose(results["R-Prec"], [0.0, 0.0, 0.0])
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_streaming_matches_batch(seed):
+    rng = np.random.default_rng(seed)
+    ranking = [str(i) for i in rng.integers(1, 60, size=rng.integers(0, 40))]
+    relevant = {str(i) for i in rng.integers(1, 60, size=rng.integers(0, 12))}
+    batch = compute_metrics([ranking], [relevant], k_values=(1, 5, 20))
+    streamed = streaming_metrics(iter(ranking), relevant, k_values=(1, 5, 20))
+    for name, values in batch.items():
+        assert streamed[name] == pytest.approx(values[0]), name
@@ -0,0 +1,45 @@
+from result_cache import SearchResultCache, bump_generation
+
+
+def test_generation_change_clears_entries_and_runs_callbacks(tmp_path):
+    invalidated = []
+    cache = SearchResultCache("docs", check_interval=0, generation_dir=tmp_path,
+                              on_invalidate=[lambda: invalidated.append(True)])
+    assert cache.get_or_search("key", lambda: ["a"]) == ["a"]
+    assert cache.get_or_search("key", lambda: ["b"]) == ["a"]
+    assert invalidated == []
+
+    bump_generation("docs", tmp_path)
+    assert cache.get_or_search("key", lambda: ["b"]) == ["b"]
+    assert invalidated == [True]
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_check_generation_without_a_lookup(tmp_path):
+    invalidated = []
+    cache = SearchResultCache("docs", check_interval=0, generation_dir=tmp_path,
+                              on_invalidate=[lambda: invalidated.append(True)])
+    cache.check_generation()
+    assert invalidated == []
+    bump_generation("docs", tmp_path)
+    cache.check_generation()
+    cache.check_generation()
+    assert invalidated == [True]
+
+
+def test_callbacks_run_without_the_cache_lock(tmp_path):
+    # A callback that blocks (an index build in progress) must not hold up other lookups
+    lock_free = []
+
+    def callback():
+        acquired = cache._lock.acquire(blocking=False)
+        if acquired:
+            cache._lock.release()
+        lock_free.append(acquired)
+
+    cache = SearchResultCache("docs", check_interval=0, generation_dir=tmp_path, on_invalidate=[callback])
+    bump_generation("docs", tmp_path)
+    assert cache.get_or_search("key", lambda: ["a"]) == ["a"]
+    bump_generation("docs", tmp_path)
+    cache.check_generation()
+    assert lock_free == [True, True]
@@ -0,0 +1,85 @@
+import threading
+import numpy as np
+from corpus import CORPUS_PATH, encode_documents, iter_documents
+from model_loader import MODEL_NAME
+from embedding_cache import EmbeddingCache
+
+
+def normalize_rows(matrix):
+    matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+def top_k_indices(scores, top_k):
+    # argpartition finds the top k in linear time, only those k are then sorted
+    top_k = min(top_k, scores.shape[-1])
+    if top_k <= 0:
+        return np.empty(scores.shape[:-1] + (0,), dtype=np.int64)
+    candidates = np.argpartition(-scores, top_k - 1, axis=-1)[..., :top_k]
+    order = np.argsort(-np.take_along_axis(scores, candidates, axis=-1), axis=-1, kind='stable')
+    return np.take_along_axis(candidates, order, axis=-1)
+
+
+class LocalVectorIndex:
+    # Exact cosine search over every document vector held in one normalized float32 matrix.
+    # Results use the same fields and (1 + cosine) / 2 score as Solr's knn parser.
+
+    def __init__(self, doc_ids, vectors, documents=None):
+        self.doc_ids = list(doc_ids)
+        self.matrix = normalize_rows(vectors)
+        self.documents = documents or {}
+
+    @classmethod
+    def from_corpus(cls, model, xml_path=CORPUS_PATH, model_name=None, use_cache=True):
+        docs = list(iter_documents(xml_path))
+        # Each encoder backend caches under its own name, so their vectors are never mixed
+        model_name = model_name or getattr(model, "name", MODEL_NAME)
+        cache = EmbeddingCache(model_name, model.get_sentence_embedding_dimension()) if use_cache else None
+        embeddings = encode_documents(model, [doc["text"] for doc in docs], cache=cache)
+        documents = {doc["id"]: {"title": doc["title"], "abstract": doc["abstract"]} for doc in docs}
+        return cls([doc["id"] for doc in docs], embeddings, documents)
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+    def to_result(self, index, similarity):
+        doc_id = self.doc_ids[index]
+        fields = self.documents.get(doc_id, {})
+        return {
+            "id": doc_id,
+            "title": fields.get("title", ""),
+            "abstract": fields.get("abstract", ""),
+            "score": float((1.0 + similarity) / 2.0),
+        }
+
+    def search_batch(self, query_vectors, top_k=50):
+        queries = normalize_rows(np.atleast_2d(query_vectors))
+        scores = queries @ self.matrix.T
+        indices = top_k_indices(scores, top_k)
+        similarities = np.take_along_axis(scores, indices, axis=-1)
+        return [[self.to_result(i, s) for i, s in zip(row_indices, row_scores)]
+                for row_indices, row_scores in zip(indices.tolist(), similarities.tolist())]
+
+    def search(self, query_vector, top_k=50):
+        return self.search_batch(query_vector, top_k)[0]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_vector_index(model):
+    # Built once per process from the embedding cache, so only uncached documents touch the model
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = LocalVectorIndex.from_corpus(model)
+        return _index
+
+
+def reset_vector_index():
+    # The next get_vector_index rebuilds from the corpus, reusing cached embeddings
+    global _index
+    with _index_lock:
+        _index = None